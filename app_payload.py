@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Compact App Payload
+
+Export profile for the listings payload shipped to the frontend: columnar
+JSON with scores quantized to fixed-point integers, the score breakdown as the
+five subscores instead of a prose string, repeated strings dictionary-encoded,
+feature flags packed into one bitmask per listing, and precompressed gzip and
+brotli variants written next to it.
+"""
+
+import argparse
+import gzip
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from facet_index import as_bool, parse_list
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; only the .br variant is skipped without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_VERSION = 1
+SUBSCORES = ['affordability', 'accessibility', 'safety', 'commute', 'inclusivity']
+
+# Output field (app Listing names) -> candidate gold columns, for both pipelines' schemas
+TEXT_FIELDS = {
+    'title': ['title', 'name'],
+    'addr': ['addr', 'address'],
+    'mgmt_hours_late': ['mgmt_hours_late', 'management_hours'],
+    'description': ['description']
+}
+INTEGER_FIELDS = {
+    'rent': ['rent'],
+    'avg_utils': ['avg_utils', 'utilities'],
+    'deposit': ['deposit', 'deposits'],
+    'bedrooms': ['bedrooms'],
+    'bathrooms': ['bathrooms'],
+    'sqft': ['sqft'],
+    'doorway_width_cm': ['doorway_width_cm', 'doorway_width'],
+    'walk_min': ['walk_min', 'walk_time'],
+    'bus_headway_min': ['bus_headway_min', 'bus_frequency']
+}
+# Fixed-point fields: stored as round(value * scale)
+FIXED_POINT_FIELDS = {
+    'lat': (['lat'], 100000),
+    'lng': (['lng'], 100000),
+    'dist_to_campus_km': (['dist_to_campus_km', 'distance_to_campus'], 100),
+    'di_score': (['di_score', 'overall_di_score'], 10)
+}
+SUBSCORE_SCALE = 10
+FLAG_FIELDS = {
+    'step_free': ['step_free', 'step_free_entry'],
+    'elevator': ['elevator'],
+    'acc_bath': ['acc_bath', 'accessible_bathroom'],
+    'acc_parking': ['acc_parking', 'accessible_parking'],
+    'well_lit': ['well_lit', 'lit_streets'],
+    'accepts_international': ['accepts_international'],
+    'no_ssn_ok': ['no_ssn_ok', 'no_ssn_required'],
+    'cosigner_ok': ['cosigner_ok', 'allows_cosigner'],
+    'anti_disc_policy': ['anti_disc_policy', 'anti_discrimination_policy']
+}
+# Text columns with at most this share of distinct values are dictionary-encoded
+DICTIONARY_MAX_RATIO = 0.5
+
+def _source(gold_df: pd.DataFrame, candidates: List[str]) -> Optional[pd.Series]:
+    return next((gold_df[c] for c in candidates if c in gold_df.columns), None)
+
+def _quantize(values: pd.Series, scale: int = 1) -> List[Optional[int]]:
+    numeric = pd.to_numeric(values, errors='coerce').to_numpy(float) * scale
+    return [None if np.isnan(v) else int(v) for v in np.round(numeric)]
+
+def _encode_text(values: pd.Series, dictionaries: Dict[str, list], name: str) -> list:
+    values = values.where(values.notna(), None)
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if len(values) and len(uniques) / len(values) <= DICTIONARY_MAX_RATIO:
+        dictionaries[name] = [str(u) for u in uniques]
+        return [None if c < 0 else int(c) for c in codes]
+    return [None if v is None else str(v) for v in values]
+
+def build_app_payload(gold_df: pd.DataFrame) -> dict:
+    """Columnar, quantized, dictionary-encoded payload for the listings page"""
+    columns, dictionaries = {'id': [int(v) if isinstance(v, (int, np.integer)) else str(v) for v in gold_df['id']]}, {}
+    scales = {}
+
+    for name, candidates in TEXT_FIELDS.items():
+        values = _source(gold_df, candidates)
+        if values is not None:
+            columns[name] = _encode_text(values, dictionaries, name)
+    for name, candidates in INTEGER_FIELDS.items():
+        values = _source(gold_df, candidates)
+        if values is not None:
+            columns[name] = _quantize(values)
+    for name, (candidates, scale) in FIXED_POINT_FIELDS.items():
+        values = _source(gold_df, candidates)
+        if values is not None:
+            columns[name] = _quantize(values, scale)
+            scales[name] = scale
+
+    # Score breakdown as the five subscores, one fixed-point column each
+    if 'subscores' in gold_df.columns:
+        subscores = pd.DataFrame(gold_df['subscores'].tolist(), index=gold_df.index)
+    else:
+        subscores = gold_df[[f'{c}_score' for c in SUBSCORES]].set_axis(SUBSCORES, axis=1)
+    columns['subscores'] = {c: _quantize(subscores[c], SUBSCORE_SCALE) for c in SUBSCORES}
+    scales['subscores'] = SUBSCORE_SCALE
+
+    if 'score_tier' in gold_df.columns:
+        codes, tiers = pd.factorize(gold_df['score_tier'])
+        dictionaries['score_tier'] = [str(t) for t in tiers]
+        columns['score_tier'] = codes.tolist()
+
+    # Feature flags packed into one integer per listing; bit i = flags[i]
+    flag_names, flag_bits = [], np.zeros(len(gold_df), dtype=np.int64)
+    for name, candidates in FLAG_FIELDS.items():
+        values = _source(gold_df, candidates)
+        if values is not None:
+            flag_bits |= as_bool(values).astype(np.int64) << len(flag_names)
+            flag_names.append(name)
+    columns['flags'] = flag_bits.tolist()
+
+    if 'amenities' in gold_df.columns:
+        amenities = gold_df['amenities'].map(parse_list)
+        vocabulary = {}
+        columns['amenities'] = [[vocabulary.setdefault(a, len(vocabulary)) for a in row] for row in amenities]
+        dictionaries['amenities'] = list(vocabulary)
+
+    return {
+        'version': PAYLOAD_VERSION,
+        'count': len(gold_df),
+        'scales': scales,
+        'flags': flag_names,
+        'dictionaries': dictionaries,
+        'columns': columns
+    }
+
+def write_app_payload(gold_df: pd.DataFrame, output_dir, name: str = "app_payload") -> Dict[str, int]:
+    """Write the compact payload plus .gz and .br variants; returns the byte size of each file"""
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    raw = json.dumps(build_app_payload(gold_df), separators=(',', ':')).encode('utf-8')
+
+    files = {f"{name}.json": raw, f"{name}.json.gz": gzip.compress(raw, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        files[f"{name}.json.br"] = brotli.compress(raw, quality=11)
+    else:
+        logger.warning("brotli is not installed; skipping the .br payload variant")
+
+    for filename, data in files.items():
+        (output_path / filename).write_bytes(data)
+    return {filename: len(data) for filename, data in files.items()}
+
+def main(argv: List[str] = None):
+    """Write the compact payload from a gold Parquet file produced by either pipeline"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compact, precompressed app payload export")
+    parser.add_argument("--gold", default="output/housing_di_scores.parquet")
+    parser.add_argument("--output-dir", default="output")
+    args = parser.parse_args(argv)
+
+    sizes = write_app_payload(pd.read_parquet(args.gold), args.output_dir)
+    for filename, size in sizes.items():
+        logger.info(f"📦 {filename}: {size / 1024:.1f} KiB")
+    return sizes
+
+if __name__ == "__main__":
+    main()
@@ -6,19 +6,191 @@ Bronze → Silver → Gold data processing with comprehensive D&I scoring
 
 import pandas as pd
 import numpy as np
+import argparse
+import cProfile
 import json
 import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import logging
 
+from app_payload import write_app_payload
+from facet_index import FacetIndex
+from score_history import ScoreHistory
+from similar_listings import SimilarityIndex
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Set to 1 to profile every stage without passing --profile (e.g. on a production run)
+PROFILE_ENV_VAR = "DI_PIPELINE_PROFILE"
+PROFILE_TOP_FUNCTIONS = 30
+PROFILE_TOP_ALLOCATIONS = 25
+
+# Weights of the overall D&I score and the tier cut-offs applied to it
+SCORE_WEIGHTS = {
+    'affordability': 0.35,
+    'accessibility': 0.20,
+    'safety': 0.20,
+    'commute': 0.15,
+    'inclusivity': 0.10
+}
+TIER_THRESHOLDS = [(90, 'Gold'), (75, 'Silver'), (50, 'Bronze')]
+DEFAULT_TIER = 'Needs Improvement'
+# Columns gold adds from DIPipeline._calculate_di_score
+SCORE_COLUMNS = ['di_score', 'subscores', 'score_tier', 'score_breakdown', 'accessibility_features', 'inclusive_features']
+
+# pd.read_csv options tried in order on the listings feed; the later ones skip malformed lines
+CSV_READ_STRATEGIES = [
+    {'quotechar': '"', 'escapechar': '\\'},
+    {'quoting': 1, 'escapechar': '\\', 'on_bad_lines': 'skip'},
+    {'sep': ',', 'on_bad_lines': 'skip'},
+]
+
+EARTH_RADIUS_KM = 6371.0
+WALKING_SPEED_KMH = 5.0
+
+# Silver validation: inclusive plausible ranges of the standardized numeric columns
+VALIDATION_RANGES = {
+    'rent': (1, 50000),
+    'avg_utils': (0, 5000),
+    'deposit': (0, 100000),
+    'bedrooms': (0, 20),
+    'bathrooms': (0, 20),
+    'sqft': (50, 50000),
+    'lat': (-90, 90),
+    'lng': (-180, 180),
+    'doorway_width_cm': (20, 200),  # feeds report inches as well as centimetres
+    'dist_to_campus_km': (0, 200),
+    'walk_min': (0, 600),
+    'bus_headway_min': (0, 1440)
+}
+# A walk faster than this between the listing and campus means distance or walk time is wrong
+MAX_WALK_SPEED_KMH = 15.0
+TRUE_VALUES = ['true', '1', 'yes']
+FALSE_VALUES = ['false', '0', 'no']
+
+def score_tiers(scores: np.ndarray) -> np.ndarray:
+    """Vectorized tier assignment matching TIER_THRESHOLDS"""
+    scores = np.asarray(scores)
+    return np.select([scores >= t for t, _ in TIER_THRESHOLDS], [name for _, name in TIER_THRESHOLDS], DEFAULT_TIER)
+
+def format_breakdown(subscores: Dict[str, float]) -> str:
+    """Human-readable subscore summary used as gold's score_breakdown"""
+    return ", ".join(f"{name.capitalize()}: {subscores[name]:.1f}" for name in SCORE_WEIGHTS)
+
+def haversine_matrix(lat: np.ndarray, lng: np.ndarray, campus_lat: np.ndarray, campus_lng: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between every listing and every campus (listings x campuses)"""
+    lat = np.radians(np.asarray(lat, dtype=float))[:, None]
+    lng = np.radians(np.asarray(lng, dtype=float))[:, None]
+    campus_lat = np.radians(np.asarray(campus_lat, dtype=float))[None, :]
+    campus_lng = np.radians(np.asarray(campus_lng, dtype=float))[None, :]
+    a = np.sin((campus_lat - lat) / 2) ** 2 + np.cos(lat) * np.cos(campus_lat) * np.sin((campus_lng - lng) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+def parse_campuses(specs: List[str]) -> Dict[str, Tuple[float, float]]:
+    """Campus coordinates from repeated NAME=LAT,LNG command-line values"""
+    campuses = {}
+    for spec in specs:
+        name, _, coords = spec.partition("=")
+        lat, lng = (float(v) for v in coords.split(","))
+        campuses[name] = (lat, lng)
+    return campuses
+
+@contextmanager
+def profile_stage(stage: str, profile_dir: Optional[Path]):
+    """Profile a pipeline stage with cProfile and tracemalloc when profile_dir is set"""
+    if profile_dir is None:
+        yield
+        return
+    
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        # Binary dump for snakeviz/pstats plus a readable summary next to it
+        profiler.dump_stats(profile_dir / f"{stage}.prof")
+        with open(profile_dir / f"{stage}.txt", 'w') as f:
+            f.write(f"Stage: {stage}\nPeak traced memory: {peak / 2**20:.1f} MiB\n\n")
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            f.write("Top allocation sites (live at end of stage):\n")
+            for stat in snapshot.statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]:
+                f.write(f"  {stat}\n")
+        logger.info(f"🔬 Profiled {stage}: peak {peak / 2**20:.1f} MiB, dumps in {profile_dir}/")
+
 class DIPipeline:
-    def __init__(self, data_path: str = "data/sample_listings.csv"):
+    # Source columns the silver and gold stages need, mapped to their standardized names
+    COLUMN_MAPPING = {
+        'id': 'id',
+        'name': 'title',
+        'address': 'addr',
+        'rent': 'rent',
+        'utilities': 'avg_utils',
+        'deposits': 'deposit',
+        'bedrooms': 'bedrooms',
+        'bathrooms': 'bathrooms',
+        'sqft': 'sqft',
+        'lat': 'lat',
+        'lng': 'lng',
+        'step_free_entry': 'step_free',
+        'elevator': 'elevator',
+        'doorway_width': 'doorway_width_cm',
+        'accessible_bathroom': 'acc_bath',
+        'accessible_parking': 'acc_parking',
+        'lit_streets': 'well_lit',
+        'distance_to_campus': 'dist_to_campus_km',
+        'walk_time': 'walk_min',
+        'bus_frequency': 'bus_headway_min',
+        'accepts_international': 'accepts_international',
+        'no_ssn_required': 'no_ssn_ok',
+        'allows_cosigner': 'cosigner_ok',
+        'anti_discrimination_policy': 'anti_disc_policy',
+        'management_hours': 'mgmt_hours_late'
+    }
+    # Standardized columns silver parses as numbers and as true/false flags
+    NUMERIC_COLUMNS = ['rent', 'avg_utils', 'deposit', 'bedrooms', 'bathrooms', 'sqft', 'lat', 'lng', 'doorway_width_cm', 'dist_to_campus_km', 'walk_min', 'bus_headway_min']
+    BOOLEAN_COLUMNS = ['step_free', 'elevator', 'acc_bath', 'acc_parking', 'well_lit', 'accepts_international', 'no_ssn_ok', 'cosigner_ok', 'anti_disc_policy']
+    # Defaults silver fills missing values with
+    MISSING_DEFAULTS = {
+        'bedrooms': 1,
+        'bathrooms': 1,
+        'avg_utils': 0,
+        'deposit': 0,
+        'dist_to_campus_km': 2.0,
+        'walk_min': 20,
+        'bus_headway_min': 20
+    }
+    
+    def __init__(self, data_path: str = "data/sample_listings.csv", low_memory: bool = False,
+                 project_columns: bool = False, campuses: Optional[Dict[str, Tuple[float, float]]] = None,
+                 validate: bool = True):
         self.data_path = data_path
+        # Low-memory mode hands each stage's frame to the next one instead of
+        # copying it, so only one copy of the catalogue is held at a time
+        self.low_memory = low_memory
+        # Column projection scores a narrow frame of COLUMN_MAPPING fields; the wide
+        # text/list columns are read only at export time and joined back by id
+        self.project_columns = project_columns
+        # Campus name -> (lat, lng); gold adds per-campus distance, walk time,
+        # safety, commute and D&I score columns for each one
+        self.campuses = dict(campuses or {})
+        # Validation moves rows with unparseable, implausible or inconsistent values out of
+        # silver into quarantine_df (with reason codes) instead of letting defaults fill them
+        self.validate = validate
+        self.quarantine_df = None
+        self.validation_counts = None
         self.bronze_df = None
         self.silver_df = None
         self.gold_df = None
@@ -31,15 +203,9 @@ class DIPipeline:
             logger.error(f"Data file not found: {self.data_path}")
             return self._create_sample_data()
         
+        usecols = (lambda c: c in self.COLUMN_MAPPING) if self.project_columns else None
         try:
-            # Try different CSV parsing strategies
-            try:
-                self.bronze_df = pd.read_csv(self.data_path, quotechar='"', escapechar='\\')
-            except pd.errors.ParserError:
-                try:
-                    self.bronze_df = pd.read_csv(self.data_path, quoting=1, escapechar='\\', on_bad_lines='skip')
-                except:
-                    self.bronze_df = pd.read_csv(self.data_path, sep=',', on_bad_lines='skip')
+            self.bronze_df = self._read_csv(usecols)
         except Exception as e:
             logger.error(f"Failed to read CSV: {e}")
             return self._create_sample_data()
@@ -47,6 +213,26 @@ class DIPipeline:
         logger.info(f"✅ Bronze: Loaded {len(self.bronze_df)} raw listings")
         return self.bronze_df
     
+    def _read_csv(self, usecols=None) -> pd.DataFrame:
+        """Read the listings CSV, trying different parsing strategies"""
+        for options in CSV_READ_STRATEGIES[:-1]:
+            try:
+                return pd.read_csv(self.data_path, usecols=usecols, **options)
+            except Exception:
+                continue
+        return pd.read_csv(self.data_path, usecols=usecols, **CSV_READ_STRATEGIES[-1])
+    
+    def _join_wide_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Join the wide text/list columns skipped by column projection back on id"""
+        if not self.project_columns or not os.path.exists(self.data_path):
+            return df
+        
+        wide_df = self._read_csv(lambda c: c == 'id' or c not in self.COLUMN_MAPPING)
+        if 'id' not in wide_df.columns or 'id' not in df.columns:
+            logger.warning("Cannot join wide columns without an id column")
+            return df
+        return df.merge(wide_df.drop_duplicates('id', keep='last'), on='id', how='left')
+    
     def silver_layer(self) -> pd.DataFrame:
         """Silver Layer: Data cleaning and transformation"""
         logger.info("🟡 Silver Layer: Cleaning and transforming data...")
@@ -54,66 +240,105 @@ class DIPipeline:
         if self.bronze_df is None:
             self.bronze_layer()
         
-        self.silver_df = self.bronze_df.copy()
-        
         # Standardize column names
-        column_mapping = {
-            'id': 'id',
-            'name': 'title',
-            'address': 'addr',
-            'rent': 'rent',
-            'utilities': 'avg_utils',
-            'deposits': 'deposit',
-            'bedrooms': 'bedrooms',
-            'bathrooms': 'bathrooms',
-            'sqft': 'sqft',
-            'lat': 'lat',
-            'lng': 'lng',
-            'step_free_entry': 'step_free',
-            'elevator': 'elevator',
-            'doorway_width': 'doorway_width_cm',
-            'accessible_bathroom': 'acc_bath',
-            'accessible_parking': 'acc_parking',
-            'lit_streets': 'well_lit',
-            'distance_to_campus': 'dist_to_campus_km',
-            'walk_time': 'walk_min',
-            'bus_frequency': 'bus_headway_min',
-            'accepts_international': 'accepts_international',
-            'no_ssn_required': 'no_ssn_ok',
-            'allows_cosigner': 'cosigner_ok',
-            'anti_discrimination_policy': 'anti_disc_policy',
-            'management_hours': 'mgmt_hours_late'
-        }
-        
-        # Rename columns
-        for old_name, new_name in column_mapping.items():
-            if old_name in self.silver_df.columns:
-                self.silver_df[new_name] = self.silver_df[old_name]
-        
-        # Convert data types
-        numeric_columns = ['rent', 'avg_utils', 'deposit', 'bedrooms', 'bathrooms', 'sqft', 'lat', 'lng', 'doorway_width_cm', 'dist_to_campus_km', 'walk_min', 'bus_headway_min']
-        for col in numeric_columns:
+        if self.low_memory:
+            # True rename in place; the bronze frame is consumed and released
+            self.silver_df = self.bronze_df
+            self.bronze_df = None
+            self.silver_df.rename(columns=self.COLUMN_MAPPING, inplace=True)
+        else:
+            self.silver_df = self.bronze_df.copy()
+            for old_name, new_name in self.COLUMN_MAPPING.items():
+                if old_name in self.silver_df.columns:
+                    self.silver_df[new_name] = self.silver_df[old_name]
+        
+        # Convert data types, remembering values that were present but did not parse
+        bad_values = {}
+        for col in self.NUMERIC_COLUMNS:
             if col in self.silver_df.columns:
-                self.silver_df[col] = pd.to_numeric(self.silver_df[col], errors='coerce')
+                raw = self.silver_df[col]
+                self.silver_df[col] = pd.to_numeric(raw, errors='coerce')
+                # Columns the CSV reader already parsed as numbers cannot hold bad values
+                if self.validate and not pd.api.types.is_numeric_dtype(raw.dtype):
+                    bad = (self.silver_df[col].isna() & raw.notna() & (raw.astype(str).str.strip() != '')).to_numpy()
+                    if bad.any():
+                        bad_values[col] = pd.Series(raw.to_numpy()[bad], index=np.flatnonzero(bad))
         
         # Handle boolean columns
-        boolean_columns = ['step_free', 'elevator', 'acc_bath', 'acc_parking', 'well_lit', 'accepts_international', 'no_ssn_ok', 'cosigner_ok', 'anti_disc_policy']
-        for col in boolean_columns:
-            if col in self.silver_df.columns:
-                self.silver_df[col] = self.silver_df[col].astype(str).str.lower().isin(['true', '1', 'yes'])
+        for col in self.BOOLEAN_COLUMNS:
+            # Columns the CSV reader already parsed as booleans skip the string round trip
+            if col in self.silver_df.columns and not pd.api.types.is_bool_dtype(self.silver_df[col].dtype):
+                raw = self.silver_df[col]
+                lowered = raw.astype(str).str.lower()
+                self.silver_df[col] = lowered.isin(TRUE_VALUES)
+                if self.validate:
+                    bad = (~self.silver_df[col] & raw.notna() & ~lowered.isin(FALSE_VALUES)).to_numpy()
+                    if bad.any():
+                        bad_values[col] = pd.Series(raw.to_numpy()[bad], index=np.flatnonzero(bad))
+        
+        if self.validate:
+            self._validate(bad_values)
         
         # Fill missing values
-        self.silver_df['bedrooms'] = self.silver_df['bedrooms'].fillna(1)
-        self.silver_df['bathrooms'] = self.silver_df['bathrooms'].fillna(1)
-        self.silver_df['avg_utils'] = self.silver_df['avg_utils'].fillna(0)
-        self.silver_df['deposit'] = self.silver_df['deposit'].fillna(0)
-        self.silver_df['dist_to_campus_km'] = self.silver_df['dist_to_campus_km'].fillna(2.0)
-        self.silver_df['walk_min'] = self.silver_df['walk_min'].fillna(20)
-        self.silver_df['bus_headway_min'] = self.silver_df['bus_headway_min'].fillna(20)
+        for col, default in self.MISSING_DEFAULTS.items():
+            self.silver_df[col] = self.silver_df[col].fillna(default)
         
         logger.info(f"✅ Silver: Cleaned {len(self.silver_df)} listings")
         return self.silver_df
     
+    def _validate(self, bad_values: Dict[str, pd.Series]):
+        """Quarantine silver rows failing type, range or cross-field checks, one vectorized mask per rule
+        
+        bad_values maps a column to its unparseable raw values, indexed by row position.
+        """
+        df = self.silver_df
+        rules = {}
+        for col, values in bad_values.items():
+            rules[f'bad_type:{col}'] = np.zeros(len(df), dtype=bool)
+            rules[f'bad_type:{col}'][values.index] = True
+        if 'id' in df.columns:
+            rules['missing_id'] = df['id'].isna().to_numpy()
+            rules['duplicate_id'] = (df['id'].duplicated(keep='last') & df['id'].notna()).to_numpy()
+        if 'rent' in df.columns:
+            unparsed = rules.get('bad_type:rent', np.zeros(len(df), dtype=bool))
+            rules['missing_rent'] = df['rent'].isna().to_numpy() & ~unparsed
+        for col, (low, high) in VALIDATION_RANGES.items():
+            if col in df.columns:
+                values = df[col].to_numpy(float)
+                rules[f'out_of_range:{col}'] = (values < low) | (values > high)
+        if 'lat' in df.columns and 'lng' in df.columns:
+            rules['partial_coordinates'] = df['lat'].isna().to_numpy() != df['lng'].isna().to_numpy()
+        if 'dist_to_campus_km' in df.columns and 'walk_min' in df.columns:
+            distance = df['dist_to_campus_km'].to_numpy(float)
+            walk = df['walk_min'].to_numpy(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rules['walk_time_distance_mismatch'] = (walk > 0) & (distance / (walk / 60) > MAX_WALK_SPEED_KMH)
+        
+        self.validation_counts = {rule: int(mask.sum()) for rule, mask in rules.items()}
+        if not rules:
+            self.quarantine_df = df.iloc[:0]
+            return
+        failing = np.logical_or.reduce(list(rules.values()))
+        
+        quarantine = df[failing].reset_index(drop=True)
+        # Reason codes are built once per distinct combination of failed rules, not per row
+        names = list(rules)
+        failed = np.column_stack([rules[name][failing] for name in names])
+        patterns, inverse = np.unique(failed, axis=0, return_inverse=True)
+        labels = np.array([';'.join(n for n, hit in zip(names, row) if hit) for row in patterns], dtype=object)
+        quarantine['reason_codes'] = labels[inverse.ravel()]
+        # Unparseable values were coerced to NaN in the row, so keep the originals alongside
+        raw_values = np.full(len(df), '{}', dtype=object)
+        for pos in sorted(set().union(*(values.index for values in bad_values.values()))):
+            raw_values[pos] = json.dumps({col: str(values[pos]) for col, values in bad_values.items() if pos in values.index})
+        quarantine['raw_values'] = raw_values[failing]
+        self.quarantine_df = quarantine
+        
+        if failing.any():
+            self.silver_df = df[~failing].reset_index(drop=True)
+            violated = {rule: count for rule, count in self.validation_counts.items() if count}
+            logger.warning(f"🚧 Quarantined {int(failing.sum())} of {len(df)} listings: {violated}")
+    
     def gold_layer(self) -> pd.DataFrame:
         """Gold Layer: D&I scoring and insights"""
         logger.info("🟢 Gold Layer: Calculating D&I scores...")
@@ -121,22 +346,107 @@ class DIPipeline:
         if self.silver_df is None:
             self.silver_layer()
         
-        self.gold_df = self.silver_df.copy()
+        if self.low_memory:
+            self.gold_df = self.silver_df
+            self.silver_df = None
+        else:
+            self.gold_df = self.silver_df.copy()
         
-        # Calculate D&I scores for each listing
-        scores = self.gold_df.apply(self._calculate_di_score, axis=1)
-        score_df = pd.DataFrame(scores.tolist())
+        # Calculate D&I scores for each listing (validation may have quarantined every one)
+        scores = self.gold_df.apply(self._calculate_di_score, axis=1).tolist() if len(self.gold_df) else []
+        score_df = pd.DataFrame(scores, columns=SCORE_COLUMNS)
         
         # Combine with original data
-        self.gold_df = pd.concat([self.gold_df, score_df], axis=1)
+        if self.low_memory:
+            # Attach score columns directly rather than concatenating a second frame
+            for name, values in score_df.items():
+                self.gold_df[name] = values.to_numpy()
+            del scores, score_df
+        else:
+            self.gold_df = pd.concat([self.gold_df, score_df], axis=1)
         
         # Add additional insights
         self.gold_df['total_monthly_cost'] = self.gold_df['rent'] + self.gold_df['avg_utils']
         self.gold_df['affordability_ratio'] = self.gold_df['total_monthly_cost'] / 2000  # Normalize to $2000 budget
         
+        if self.campuses:
+            self._score_campuses()
+        
         logger.info(f"✅ Gold: Calculated D&I scores for {len(self.gold_df)} listings")
         return self.gold_df
     
+    def subscore_frame(self) -> pd.DataFrame:
+        """Gold subscores as one numeric column per SCORE_WEIGHTS component"""
+        return pd.DataFrame(self.gold_df['subscores'].tolist(), index=self.gold_df.index)[list(SCORE_WEIGHTS)]
+    
+    def _score_campuses(self):
+        """Score every listing against every campus in bulk (listings x campuses matrices)"""
+        names = list(self.campuses)
+        coords = np.array([self.campuses[name] for name in names], dtype=float)
+        
+        distance = haversine_matrix(self.gold_df['lat'], self.gold_df['lng'], coords[:, 0], coords[:, 1])
+        walk_time = distance / WALKING_SPEED_KMH * 60
+        
+        # Listings without coordinates fall back to the feed's single-campus values
+        missing = np.isnan(distance)
+        if missing.any():
+            distance = np.where(missing, self.gold_df['dist_to_campus_km'].to_numpy(float)[:, None], distance)
+            walk_time = np.where(missing, self.gold_df['walk_min'].to_numpy(float)[:, None], walk_time)
+        
+        # Same safety and commute rules as _calculate_di_score, broadcast across campuses,
+        # including its `or 2` / `or 20` fallbacks for zero values
+        distance = np.where(distance == 0, 2.0, distance)
+        walk_time = np.where(walk_time == 0, 20.0, walk_time)
+        well_lit = self.gold_df['well_lit'].to_numpy(bool)[:, None] if 'well_lit' in self.gold_df else False
+        bus_headway = self.gold_df['bus_headway_min'].to_numpy(float)[:, None]
+        bus_headway = np.where(bus_headway == 0, 20.0, bus_headway)
+        safety = np.minimum(100, np.maximum(0, 100 - distance * 15) + np.where(well_lit, 20, 0))
+        commute = np.maximum(0, 100 - (walk_time + bus_headway) / 2)
+        
+        subscores = self.subscore_frame()
+        base = sum(SCORE_WEIGHTS[c] * subscores[c].to_numpy(float)[:, None]
+                   for c in ('affordability', 'accessibility', 'inclusivity'))
+        overall = base + SCORE_WEIGHTS['safety'] * safety + SCORE_WEIGHTS['commute'] * commute
+        
+        campus_columns = {}
+        for j, name in enumerate(names):
+            campus_columns[f'dist_km_{name}'] = distance[:, j].round(3)
+            campus_columns[f'walk_min_{name}'] = walk_time[:, j].round(1)
+            campus_columns[f'safety_{name}'] = safety[:, j].round(2)
+            campus_columns[f'commute_{name}'] = commute[:, j].round(2)
+            campus_columns[f'di_score_{name}'] = overall[:, j].round(2)
+        for column, values in campus_columns.items():
+            self.gold_df[column] = values
+    
+    def campus_view(self, campus: str) -> pd.DataFrame:
+        """Gold listings scored against one campus, exposed under the generic column names"""
+        if campus not in self.campuses:
+            raise KeyError(f"Unknown campus: {campus}")
+        if self.gold_df is None:
+            self.gold_layer()
+        
+        campus_columns = {
+            f'dist_km_{campus}': 'dist_to_campus_km',
+            f'walk_min_{campus}': 'walk_min',
+            f'safety_{campus}': 'safety_score',
+            f'commute_{campus}': 'commute_score',
+            f'di_score_{campus}': 'di_score'
+        }
+        other_campus_columns = [
+            f'{prefix}_{name}' for name in self.campuses if name != campus
+            for prefix in ('dist_km', 'walk_min', 'safety', 'commute', 'di_score')
+        ]
+        view = self.gold_df.drop(columns=other_campus_columns + list(campus_columns.values()), errors='ignore')
+        view = view.rename(columns=campus_columns)
+        view['score_tier'] = score_tiers(view['di_score'].to_numpy())
+        # The subscores and breakdown text must describe this campus's safety and commute too
+        view['subscores'] = [
+            {**subscores, 'safety': safety, 'commute': commute}
+            for subscores, safety, commute in zip(view['subscores'], view['safety_score'], view['commute_score'])
+        ]
+        view['score_breakdown'] = [format_breakdown(subscores) for subscores in view['subscores']]
+        return view.sort_values('di_score', ascending=False)
+    
     def _calculate_di_score(self, row: pd.Series) -> Dict:
         """Calculate comprehensive D&I score with breakdown"""
         
@@ -203,22 +513,15 @@ class DIPipeline:
         
         # Weighted overall score
         overall_score = (
-            0.35 * affordability +
-            0.20 * accessibility +
-            0.20 * safety +
-            0.15 * commute +
-            0.10 * inclusivity
+            SCORE_WEIGHTS['affordability'] * affordability +
+            SCORE_WEIGHTS['accessibility'] * accessibility +
+            SCORE_WEIGHTS['safety'] * safety +
+            SCORE_WEIGHTS['commute'] * commute +
+            SCORE_WEIGHTS['inclusivity'] * inclusivity
         )
         
         # Determine tier
-        if overall_score >= 90:
-            tier = 'Gold'
-        elif overall_score >= 75:
-            tier = 'Silver'
-        elif overall_score >= 50:
-            tier = 'Bronze'
-        else:
-            tier = 'Needs Improvement'
+        tier = next((name for threshold, name in TIER_THRESHOLDS if overall_score >= threshold), DEFAULT_TIER)
         
         return {
             'di_score': round(overall_score, 2),
@@ -230,7 +533,13 @@ class DIPipeline:
                 'inclusivity': round(inclusivity, 2)
             },
             'score_tier': tier,
-            'score_breakdown': f"Affordability: {affordability:.1f}, Accessibility: {accessibility:.1f}, Safety: {safety:.1f}, Commute: {commute:.1f}, Inclusivity: {inclusivity:.1f}",
+            'score_breakdown': format_breakdown({
+                'affordability': affordability,
+                'accessibility': accessibility,
+                'safety': safety,
+                'commute': commute,
+                'inclusivity': inclusivity
+            }),
             'accessibility_features': ', '.join(features) if features else 'Limited accessibility features',
             'inclusive_features': ', '.join(inclusive_features) if inclusive_features else 'Limited inclusive features'
         }
@@ -265,27 +574,47 @@ class DIPipeline:
         
         return pd.DataFrame(sample_data)
     
-    def export_results(self, output_dir: str = "output"):
-        """Export results in multiple formats"""
+    def export_results(self, output_dir: str = "output", export_profile: str = "full"):
+        """Export results in multiple formats; the "compact" profile also writes the quantized app payload"""
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
         if self.gold_df is None:
             self.gold_layer()
         
+        # The app and human-readable exports carry the full listing; Parquet keeps the scored frame
+        export_df = self._join_wide_columns(self.gold_df)
+        
         # JSON for API consumption
-        self.gold_df.to_json(output_path / "gold_housing_data.json", orient='records', indent=2)
+        export_df.to_json(output_path / "gold_housing_data.json", orient='records', indent=2)
         
         # CSV for human inspection
-        self.gold_df.to_csv(output_path / "gold_housing_data.csv", index=False)
+        export_df.to_csv(output_path / "gold_housing_data.csv", index=False)
+        
+        # Quantized, dictionary-encoded and precompressed payload for mobile clients
+        if export_profile == "compact":
+            payload_sizes = write_app_payload(export_df, output_path)
+            logger.info(f"📦 Compact app payload: {payload_sizes}")
+        
+        # Facet bitmaps for live filter counts on the listings page
+        FacetIndex.from_gold(export_df).save(output_path / "facet_index.npz")
+        del export_df
+        
+        # Feature vectors and IVF index for "more like this"
+        if len(self.gold_df):
+            SimilarityIndex.from_gold(self.gold_df).save(output_path / "similarity_index.npz")
         
         # Parquet for efficient storage
         self.gold_df.to_parquet(output_path / "housing_di_scores.parquet", index=False)
         
+        # Rows silver validation rejected, with their reason codes
+        if self.quarantine_df is not None and len(self.quarantine_df):
+            self.quarantine_df.to_parquet(output_path / "quarantine.parquet", index=False)
+        
         # Summary statistics
         summary = {
             'total_listings': len(self.gold_df),
-            'average_di_score': round(self.gold_df['di_score'].mean(), 2),
+            'average_di_score': round(self.gold_df['di_score'].mean(), 2) if len(self.gold_df) else None,
             'score_distribution': self.gold_df['score_tier'].value_counts().to_dict(),
             'top_features': {
                 'most_accessible': len(self.gold_df[self.gold_df['subscores'].apply(lambda x: x['accessibility'] >= 80)]),
@@ -293,6 +622,11 @@ class DIPipeline:
                 'most_inclusive': len(self.gold_df[self.gold_df['subscores'].apply(lambda x: x['inclusivity'] >= 80)])
             }
         }
+        if self.validation_counts is not None:
+            summary['validation'] = {
+                'quarantined': 0 if self.quarantine_df is None else len(self.quarantine_df),
+                'violations': self.validation_counts
+            }
         
         with open(output_path / "pipeline_summary.json", 'w') as f:
             json.dump(summary, f, indent=2)
@@ -303,19 +637,56 @@ class DIPipeline:
         
         return summary
 
-def main():
+def main(argv: List[str] = None):
     """Main pipeline execution"""
+    parser = argparse.ArgumentParser(description="Inclusive Housing Navigator D&I Pipeline")
+    parser.add_argument("--data-path", default="data/sample_listings.csv", help="Input listings CSV")
+    parser.add_argument("--output-dir", default="output", help="Directory for exported results")
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Rename columns in place and release each stage once consumed")
+    parser.add_argument("--project-columns", action="store_true",
+                        help="Score on the scoring columns only; join text columns back at export")
+    parser.add_argument("--profile", action="store_true",
+                        default=os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0"),
+                        help=f"Write cProfile/tracemalloc dumps per stage to <output-dir>/profiles "
+                             f"(also enabled by {PROFILE_ENV_VAR}=1)")
+    parser.add_argument("--export-profile", choices=["full", "compact"], default="full",
+                        help="compact also writes a quantized, precompressed app payload")
+    parser.add_argument("--campus", action="append", default=[], metavar="NAME=LAT,LNG",
+                        help="Score commute and safety against this campus (repeatable)")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="Skip silver validation; invalid values fall back to defaults instead of quarantine")
+    parser.add_argument("--history-dir", default=None,
+                        help="Also record this run's changed scores and rents in the score history store")
+    parser.add_argument("--engine", choices=["pandas", "polars"], default="pandas",
+                        help="polars runs the stages as one lazy, multi-threaded query (needs polars)")
+    args = parser.parse_args(argv)
+    
+    campuses = parse_campuses(args.campus)
+    
     logger.info("🚀 Starting Inclusive Housing Navigator D&I Pipeline")
     
-    pipeline = DIPipeline()
+    engine = DIPipeline
+    if args.engine == "polars":
+        from polars_engine import PolarsDIPipeline
+        engine = PolarsDIPipeline
+    pipeline = engine(args.data_path, low_memory=args.low_memory,
+                      project_columns=args.project_columns, campuses=campuses,
+                      validate=not args.no_validate)
+    
+    profile_dir = Path(args.output_dir) / "profiles" if args.profile else None
     
     # Execute pipeline stages
-    pipeline.bronze_layer()
-    pipeline.silver_layer()
-    pipeline.gold_layer()
+    for stage in ("bronze_layer", "silver_layer", "gold_layer"):
+        with profile_stage(stage, profile_dir):
+            getattr(pipeline, stage)()
     
     # Export results
-    summary = pipeline.export_results()
+    with profile_stage("export_results", profile_dir):
+        summary = pipeline.export_results(args.output_dir, export_profile=args.export_profile)
+    
+    if args.history_dir:
+        ScoreHistory(args.history_dir).append(pipeline.gold_df)
     
     logger.info("🎉 Pipeline completed successfully!")
     return summary
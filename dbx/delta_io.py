@@ -0,0 +1,80 @@
+# Databricks notebook source
+"""
+Inclusive Housing Navigator - Delta upserts and partitioned exports
+
+Helpers used by the scoring notebook (via %run ./delta_io) to MERGE changed
+listings into the Delta score table instead of overwriting it, and to write
+the exports with parallel writers instead of coalesce(1).
+
+Definitions only, since %run executes the whole file in the notebook's session.
+tests/test_delta_io.py checks them against a local Spark session and a
+path-based Delta table (pip install pyspark delta-spark).
+"""
+
+from typing import Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from delta.tables import DeltaTable
+
+# Columns that change on every run and must not count as a listing change
+VOLATILE_COLUMNS = ("processed_at",)
+
+# COMMAND ----------
+
+def _is_path(target: str) -> bool:
+    return "/" in target or ":" in target
+
+def _delta_table(spark: SparkSession, target: str):
+    """Return the DeltaTable for a table name or path, or None if it does not exist yet"""
+    if _is_path(target):
+        return DeltaTable.forPath(spark, target) if DeltaTable.isDeltaTable(spark, target) else None
+    return DeltaTable.forName(spark, target) if spark.catalog.tableExists(target) else None
+
+def merge_scores(spark: SparkSession, updates_df: DataFrame, target: str, key: str = "id") -> dict:
+    """
+    Upsert scored listings into a Delta table keyed on `key`.
+
+    Only rows whose values differ from the stored row (ignoring VOLATILE_COLUMNS)
+    are rewritten; new listings are inserted and listings missing from
+    `updates_df` are deleted, so the table ends up with the same contents as an
+    overwrite. `updates_df` must be the whole catalogue. The table is created on
+    first run.
+    Returns the MERGE operation metrics (rows inserted/updated/deleted/copied).
+    """
+    table = _delta_table(spark, target)
+    if table is None:
+        writer = updates_df.write.format("delta").mode("overwrite")
+        if _is_path(target):
+            writer.save(target)
+        else:
+            writer.saveAsTable(target)
+        return {"numTargetRowsInserted": str(updates_df.count())}
+
+    compared = [c for c in updates_df.columns if c != key and c not in VOLATILE_COLUMNS]
+    # Null-safe comparison so a NULL -> NULL column is not treated as a change
+    changed = " OR ".join(f"NOT (t.`{c}` <=> s.`{c}`)" for c in compared) or "false"
+
+    (
+        table.alias("t")
+        .merge(updates_df.alias("s"), f"t.`{key}` = s.`{key}`")
+        .whenMatchedUpdateAll(condition=changed)
+        .whenNotMatchedInsertAll()
+        .whenNotMatchedBySourceDelete()
+        .execute()
+    )
+    return table.history(1).select("operationMetrics").first()["operationMetrics"]
+
+# COMMAND ----------
+
+def write_partitioned(df: DataFrame, path: str, partition_by: Optional[str] = "score_tier", fmt: str = "parquet"):
+    """
+    Write `df` (the whole catalogue) without funnelling it through one task.
+
+    Every input task writes its own files, partitioned by `partition_by` when
+    set. The overwrite is static: everything under `path` is replaced, so a tier
+    with no listings this run leaves no stale files behind.
+    """
+    writer = df.write.mode("overwrite").option("partitionOverwriteMode", "static").format(fmt)
+    if partition_by:
+        writer = writer.partitionBy(partition_by)
+    writer.save(path)
@@ -13,9 +13,11 @@
 
 import pandas as pd
 import numpy as np
+from pyspark import StorageLevel
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import *
 from pyspark.sql.types import *
+import builtins
 import json
 from datetime import datetime
 
@@ -26,14 +28,26 @@ from datetime import datetime
 
 # COMMAND ----------
 
+# Raw columns are read as strings and typed in the silver layer; an explicit
+# schema avoids the extra full scan that inferSchema triggers
+BRONZE_COLUMNS = [
+    "id", "name", "address", "rent", "utilities", "deposits", "bedrooms", "bathrooms", "sqft",
+    "lat", "lng", "step_free_entry", "elevator", "doorway_width", "accessible_bathroom",
+    "accessible_parking", "management_hours", "lit_streets", "distance_to_campus", "walk_time",
+    "bus_frequency", "accepts_international", "no_ssn_required", "allows_cosigner",
+    "anti_discrimination_policy", "responsive_comms", "description", "images", "amenities",
+    "pet_friendly", "smoking_allowed", "laundry", "internet", "utilities_included",
+    "air_conditioning", "heating", "security_features", "neighborhood_safety_score",
+    "transit_score", "walkability_score"
+]
+bronze_schema = StructType([StructField(c, StringType(), True) for c in BRONZE_COLUMNS])
+
 # Read the sample listings CSV
-bronze_df = spark.read.option("header", "true").option("inferSchema", "true").csv("/FileStore/shared_uploads/sample_listings.csv")
+bronze_df = spark.read.option("header", "true").schema(bronze_schema).csv("/FileStore/shared_uploads/sample_listings.csv")
 
-# Display schema and sample data
+# Display schema (no Spark job; sample rows are shown once gold is cached)
 print("Bronze Layer Schema:")
 bronze_df.printSchema()
-print("\nSample Data:")
-bronze_df.show(5)
 
 # COMMAND ----------
 
@@ -81,9 +95,9 @@ silver_df = bronze_df.select(
     col("walkability_score").cast("int")
 ).withColumn("processed_at", current_timestamp())
 
-# Display cleaned data
-print("Silver Layer Sample:")
-silver_df.show(5)
+# Display cleaned schema
+print("Silver Layer Schema:")
+silver_df.printSchema()
 
 # COMMAND ----------
 
@@ -266,15 +280,10 @@ gold_df = silver_df.withColumn(
     "processed_at", current_timestamp()
 )
 
-# COMMAND ----------
-
-# Display results
-print("Gold Layer - D&I Scored Data:")
-gold_df.select(
-    "id", "name", "overall_di_score", "score_tier", 
-    "affordability_score", "accessibility_score", "safety_score", 
-    "commute_score", "inclusivity_score", "score_breakdown"
-).show(10)
+# Gold is computed once: the first write below materializes the cache and every
+# later display, export and summary reads from it instead of re-running the
+# CSV scan and the scoring UDFs
+gold_df = gold_df.persist(StorageLevel.MEMORY_AND_DISK)
 
 # COMMAND ----------
 
@@ -283,21 +292,40 @@ gold_df.select(
 
 # COMMAND ----------
 
+# MAGIC %run ./delta_io
+
+# COMMAND ----------
+
+# "merge" upserts only changed listings keyed on id and deletes delisted ones; "overwrite" rebuilds the table
+WRITE_MODE = "merge"
+
 # Save to Delta table
-gold_df.write.mode("overwrite").option("overwriteSchema", "true").saveAsTable("housing_di_scores")
+if WRITE_MODE == "merge":
+    merge_metrics = merge_scores(spark, gold_df, "housing_di_scores", key="id")
+    print(f"Delta MERGE: {merge_metrics}")
+else:
+    gold_df.write.mode("overwrite").option("overwriteSchema", "true").saveAsTable("housing_di_scores")
 
-# Export to JSON for the app
+# Display results
+print("Gold Layer - D&I Scored Data:")
 gold_df.select(
+    "id", "name", "overall_di_score", "score_tier", 
+    "affordability_score", "accessibility_score", "safety_score", 
+    "commute_score", "inclusivity_score", "score_breakdown"
+).show(10)
+
+# Export to JSON for the app with one writer per input task; not partitioned, so every record keeps its score_tier
+write_partitioned(gold_df.select(
     "id", "name", "address", "rent", "utilities", "deposits", "bedrooms", "bathrooms", "sqft",
     "lat", "lng", "overall_di_score", "score_tier", "affordability_score", "accessibility_score",
     "safety_score", "commute_score", "inclusivity_score", "score_breakdown", "description",
     "amenities", "step_free_entry", "elevator", "accessible_bathroom", "accessible_parking",
     "accepts_international", "no_ssn_required", "allows_cosigner", "anti_discrimination_policy",
     "responsive_comms", "neighborhood_safety_score", "transit_score", "walkability_score"
-).coalesce(1).write.mode("overwrite").json("/FileStore/shared_uploads/gold_housing_data.json")
+), "/FileStore/shared_uploads/gold_housing_data.json", partition_by=None, fmt="json")
 
 # Also save as Parquet for better performance
-gold_df.coalesce(1).write.mode("overwrite").parquet("/FileStore/shared_uploads/housing_di_scores.parquet")
+write_partitioned(gold_df, "/FileStore/shared_uploads/housing_di_scores.parquet", partition_by="score_tier")
 
 print("Gold data exported successfully!")
 
@@ -308,29 +336,55 @@ print("Gold data exported successfully!")
 
 # COMMAND ----------
 
-# Calculate summary statistics
-summary_stats = gold_df.agg(
-    count("*").alias("total_listings"),
-    avg("overall_di_score").alias("avg_di_score"),
+# Summary statistics and the tier distribution come from a single aggregation
+# pass over the cached gold data: per-tier partial aggregates are combined on
+# the driver (sums and non-null counts, not averages of averages). Scores can be
+# null (a DoubleType UDF returning a Python int yields null), so, like avg(),
+# each mean only divides by the listings that have that score
+subscore_columns = ["affordability_score", "accessibility_score", "safety_score", "commute_score", "inclusivity_score"]
+tier_stats = gold_df.groupBy("score_tier").agg(
+    count("*").alias("count"),
+    sum("overall_di_score").alias("sum_overall_di_score"),
+    count("overall_di_score").alias("count_overall_di_score"),
     min("overall_di_score").alias("min_di_score"),
     max("overall_di_score").alias("max_di_score"),
-    avg("affordability_score").alias("avg_affordability"),
-    avg("accessibility_score").alias("avg_accessibility"),
-    avg("safety_score").alias("avg_safety"),
-    avg("commute_score").alias("avg_commute"),
-    avg("inclusivity_score").alias("avg_inclusivity")
-).collect()[0]
+    *[sum(c).alias(f"sum_{c}") for c in subscore_columns],
+    *[count(c).alias(f"count_{c}") for c in subscore_columns]
+).collect()
+
+def combined_mean(column):
+    """Mean of `column` over all tiers; None when no listing has a value"""
+    scored = builtins.sum(row[f"count_{column}"] for row in tier_stats)
+    total = builtins.sum(row[f"sum_{column}"] for row in tier_stats if row[f"sum_{column}"] is not None)
+    return total / scored if scored else None
+
+def combined(reduce, key):
+    """min/max of per-tier aggregates, skipping tiers where every value is null"""
+    values = [row[key] for row in tier_stats if row[key] is not None]
+    return reduce(values) if values else None
+
+def fmt(value):
+    return "n/a" if value is None else f"{value:.2f}"
+
+summary_stats = {
+    "total_listings": builtins.sum(row["count"] for row in tier_stats),
+    "avg_di_score": combined_mean("overall_di_score"),
+    "min_di_score": combined(builtins.min, "min_di_score"),
+    "max_di_score": combined(builtins.max, "max_di_score"),
+}
+for c in subscore_columns:
+    summary_stats[c] = combined_mean(c)
 
 print("=== D&I Scoring Summary ===")
 print(f"Total Listings: {summary_stats['total_listings']}")
-print(f"Average D&I Score: {summary_stats['avg_di_score']:.2f}")
-print(f"Score Range: {summary_stats['min_di_score']:.2f} - {summary_stats['max_di_score']:.2f}")
+print(f"Average D&I Score: {fmt(summary_stats['avg_di_score'])}")
+print(f"Score Range: {fmt(summary_stats['min_di_score'])} - {fmt(summary_stats['max_di_score'])}")
 print(f"\nAverage Sub-scores:")
-print(f"  Affordability: {summary_stats['avg_affordability']:.2f}")
-print(f"  Accessibility: {summary_stats['avg_accessibility']:.2f}")
-print(f"  Safety: {summary_stats['avg_safety']:.2f}")
-print(f"  Commute: {summary_stats['avg_commute']:.2f}")
-print(f"  Inclusivity: {summary_stats['avg_inclusivity']:.2f}")
+print(f"  Affordability: {fmt(summary_stats['affordability_score'])}")
+print(f"  Accessibility: {fmt(summary_stats['accessibility_score'])}")
+print(f"  Safety: {fmt(summary_stats['safety_score'])}")
+print(f"  Commute: {fmt(summary_stats['commute_score'])}")
+print(f"  Inclusivity: {fmt(summary_stats['inclusivity_score'])}")
 
 # COMMAND ----------
 
@@ -339,15 +393,19 @@ print(f"  Inclusivity: {summary_stats['avg_inclusivity']:.2f}")
 
 # COMMAND ----------
 
-# Analyze score distribution
-score_distribution = gold_df.groupBy("score_tier").count().orderBy("count", ascending=False)
+# Tier distribution from the aggregation pass above (no extra Spark job)
 print("Score Tier Distribution:")
-score_distribution.show()
+for row in sorted(tier_stats, key=lambda r: r["count"], reverse=True):
+    print(f"  {row['score_tier']}: {row['count']}")
 
-# Top 10 listings by D&I score
-top_listings = gold_df.orderBy(col("overall_di_score").desc()).limit(10)
+# Top 10 listings by D&I score: a bounded take-ordered over the cached data
+top_listings = gold_df.select(
+    "id", "name", "overall_di_score", "score_tier", "rent", "address"
+).orderBy(col("overall_di_score").desc()).limit(10)
 print("\nTop 10 Listings by D&I Score:")
-top_listings.select("id", "name", "overall_di_score", "score_tier", "rent", "address").show()
+top_listings.show()
+
+gold_df.unpersist()
 
 # COMMAND ----------
 
@@ -361,3 +419,13 @@ top_listings.select("id", "name", "overall_di_score", "score_tier", "rent", "add
 # MAGIC 3. **Gold Layer**: D&I score calculation with weighted formula
 # MAGIC 
 # MAGIC The gold dataset is now available for the Next.js application via the API routes.
+# MAGIC 
+# MAGIC ### Spark jobs per run (estimate)
+# MAGIC 
+# MAGIC These counts are **estimated from the notebook's sequence of actions**, not captured from the Spark UI;
+# MAGIC check the Jobs/Stages tabs of a real run before relying on them.
+# MAGIC 
+# MAGIC | | Jobs | CSV scans | Scoring UDF passes |
+# MAGIC |---|---|---|---|
+# MAGIC | Before caching gold (inferSchema, three `show()`s, two `coalesce(1)` writes, separate aggregations) | ~12 | 9 | 6 |
+# MAGIC | After (cached gold; Delta write, sample display, JSON, Parquet, tier aggregation, top 10) | ~6 | 1 | 1 |
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Bitmap Facet Index
+
+One bitmap per boolean accessibility/inclusivity feature and per interned
+amenity, so filters like "step-free + elevator + no SSN + Laundry" and the
+live count for every filter on the listings page are a handful of word-wise
+AND/OR/NOT operations and popcounts instead of row scans.
+
+Bitmaps are packed 64 listings per uint64 word (bit i = i-th gold row) and
+zlib-compressed when saved.
+"""
+
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Boolean gold columns indexed as facets, when present (standardized and raw feed names)
+BOOLEAN_FACETS = [
+    'step_free', 'elevator', 'acc_bath', 'acc_parking', 'well_lit',
+    'accepts_international', 'no_ssn_ok', 'cosigner_ok', 'anti_disc_policy', 'responsive_comms',
+    'pet_friendly', 'smoking_allowed', 'laundry', 'internet', 'utilities_included',
+    'air_conditioning', 'heating'
+]
+AMENITY_PREFIX = 'amenity:'
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(words: np.ndarray, axis=None):
+        return np.bitwise_count(words).sum(axis=axis, dtype=np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words: np.ndarray, axis=None):
+        counts = _BYTE_COUNTS[words.view(np.uint8)]
+        if axis is None:
+            return counts.sum(dtype=np.int64)
+        return counts.reshape(words.shape[:-1] + (-1,)).sum(axis=-1, dtype=np.int64)
+
+def _pack(mask: np.ndarray) -> np.ndarray:
+    """Pack a boolean row mask into little-endian uint64 words"""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+def as_bool(values: pd.Series) -> np.ndarray:
+    """Boolean array from a flag column stored as bools or true/1/yes strings"""
+    if values.dtype == bool:
+        return values.to_numpy()
+    return values.astype(str).str.lower().isin(['true', '1', 'yes']).to_numpy()
+
+def parse_list(value) -> List[str]:
+    """List of strings from a list value, a JSON array or a comma-separated string"""
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(v) for v in value]
+    if not isinstance(value, str) or not value.strip():
+        return []
+    try:
+        parsed = json.loads(value)
+        return [str(v) for v in parsed] if isinstance(parsed, list) else [str(parsed)]
+    except ValueError:
+        return [v.strip(' "[]') for v in value.split(',') if v.strip(' "[]')]
+
+class FacetIndex:
+    def __init__(self, ids: np.ndarray, names: List[str], bitmaps: np.ndarray):
+        self.ids = np.asarray(ids)
+        self.names = list(names)
+        # facets x words; row f is the bitmap of facet names[f]
+        self.bitmaps = bitmaps
+        self._positions = {name: i for i, name in enumerate(self.names)}
+        self.universe = _pack(np.ones(len(self.ids), dtype=bool))
+
+    @classmethod
+    def from_gold(cls, gold_df: pd.DataFrame) -> "FacetIndex":
+        """Build bitmaps for the boolean feature columns and the interned amenities of a gold frame"""
+        names, masks = [], []
+        for column in BOOLEAN_FACETS:
+            if column in gold_df.columns:
+                names.append(column)
+                masks.append(as_bool(gold_df[column]))
+
+        if 'amenities' in gold_df.columns:
+            # Exploded index = gold row position of each (listing, amenity) pair
+            amenities = pd.Series(gold_df['amenities'].map(parse_list).to_numpy()).explode().dropna()
+            rows = amenities.index.to_numpy()
+            codes, vocabulary = pd.factorize(amenities.to_numpy())
+            for code, amenity in enumerate(vocabulary):
+                mask = np.zeros(len(gold_df), dtype=bool)
+                mask[rows[codes == code]] = True
+                names.append(AMENITY_PREFIX + amenity)
+                masks.append(mask)
+
+        words = -(-len(gold_df) // 64)
+        bitmaps = np.vstack([_pack(m) for m in masks]) if masks else np.zeros((0, words), dtype=np.uint64)
+        return cls(gold_df['id'].to_numpy(), names, bitmaps)
+
+    def bitmap(self, name: str) -> np.ndarray:
+        """Bitmap of one facet; raises KeyError for unknown facets"""
+        if name not in self._positions:
+            raise KeyError(f"Unknown facet: {name}")
+        return self.bitmaps[self._positions[name]]
+
+    def query(self, all_of: Iterable[str] = (), any_of: Iterable[str] = (), none_of: Iterable[str] = ()) -> np.ndarray:
+        """Listings having every `all_of` facet, at least one `any_of` facet (if given) and no `none_of` facet"""
+        selection = self.universe.copy()
+        for name in all_of:
+            selection &= self.bitmap(name)
+        any_of = list(any_of)
+        if any_of:
+            selection &= np.bitwise_or.reduce([self.bitmap(name) for name in any_of])
+        for name in none_of:
+            selection &= ~self.bitmap(name)
+        return selection
+
+    def count(self, selection: np.ndarray) -> int:
+        return int(_popcount(selection))
+
+    def match_ids(self, selection: np.ndarray) -> np.ndarray:
+        """Listing ids selected by a bitmap, in gold order"""
+        rows = np.unpackbits(selection.view(np.uint8), bitorder='little')[:len(self.ids)]
+        return self.ids[rows.astype(bool)]
+
+    def facet_counts(self, selection: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Count of listings per facet within `selection` (all listings if omitted)"""
+        selection = self.universe if selection is None else selection
+        counts = _popcount(self.bitmaps & selection, axis=1)
+        return dict(zip(self.names, counts.tolist()))
+
+    def save(self, path):
+        ids = self.ids.astype(str) if self.ids.dtype == object else self.ids
+        np.savez_compressed(path, ids=ids, names=np.array(self.names, dtype=str), bitmaps=self.bitmaps)
+
+    @classmethod
+    def load(cls, path) -> "FacetIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'], data['names'].tolist(), data['bitmaps'])
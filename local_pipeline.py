@@ -9,11 +9,16 @@ notebook functionality for local execution.
 
 import pandas as pd
 import numpy as np
+import argparse
 import json
+import time
 from datetime import datetime
 import os
 from pathlib import Path
 
+# Score tier cut-offs used by this pipeline (highest first)
+TIER_THRESHOLDS = [(90, "Gold"), (80, "Silver"), (70, "Bronze")]
+
 def calculate_affordability_score(rent, utilities, deposits, user_budget=2000):
     """
     Calculate affordability score (0-100)
@@ -137,7 +142,14 @@ def calculate_inclusivity_score(accepts_international, no_ssn_required, allows_c
         score += 15
     return score
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local D&I scoring pipeline")
+    parser.add_argument("--sensitivity-samples", type=int, default=0,
+                        help="Also run a Monte-Carlo weight sensitivity analysis with this many weight samples")
+    parser.add_argument("--history-dir", default=None,
+                        help="Also record this run's changed scores and rents in the score history store")
+    args = parser.parse_args(argv)
+    
     print("=== Inclusive Housing Navigator - Local D&I Scoring Pipeline ===\n")
     
     # Set up paths
@@ -255,7 +267,7 @@ def main():
     
     # Create score tier
     gold_df['score_tier'] = gold_df['overall_di_score'].apply(
-        lambda x: "Gold" if x >= 90 else "Silver" if x >= 80 else "Bronze" if x >= 70 else "Needs Improvement"
+        lambda x: next((tier for cutoff, tier in TIER_THRESHOLDS if x >= cutoff), "Needs Improvement")
     )
     
     # Add final processing timestamp
@@ -301,6 +313,13 @@ def main():
     gold_df.to_parquet(parquet_path, index=False)
     print(f"Parquet data saved to: {parquet_path}")
     
+    # Per-listing history across runs, recorded as deltas of the rows that changed
+    if args.history_dir:
+        from score_history import ScoreHistory
+        
+        run = ScoreHistory(args.history_dir).append(gold_df, run_at=gold_df['processed_at'].iloc[0])
+        print(f"Score history updated: {run['inserted']} inserted, {run['updated']} updated, {run['deleted']} deleted")
+    
     # Summary Statistics
     print("\n=== D&I Scoring Summary ===")
     total_listings = len(gold_df)
@@ -328,6 +347,24 @@ def main():
     top_listings = gold_df.nlargest(10, 'overall_di_score')[['id', 'name', 'overall_di_score', 'score_tier', 'rent', 'address']]
     print(top_listings.to_string(index=False))
     
+    # Weight sensitivity: how stable are these ranks and tiers around the 35/20/20/15/10 weights?
+    if args.sensitivity_samples > 0:
+        from weight_sensitivity import subscores_from_gold, weight_sensitivity
+        
+        print(f"\n=== Weight Sensitivity ({args.sensitivity_samples} weight samples) ===")
+        started = time.perf_counter()
+        sensitivity = weight_sensitivity(subscores_from_gold(gold_df), thresholds=TIER_THRESHOLDS,
+                                         n_samples=args.sensitivity_samples)
+        sensitivity.index = gold_df.index
+        print(f"Completed in {time.perf_counter() - started:.2f}s")
+        print(f"Listings with tier-flip probability > 10%: {(sensitivity['tier_flip_prob'] > 0.1).mean():.1%}")
+        top_sensitivity = sensitivity.loc[top_listings.index, ['base_rank', 'rank_p05', 'rank_p95', 'tier_flip_prob']]
+        print(pd.concat([top_listings[['id', 'name', 'overall_di_score', 'score_tier']], top_sensitivity], axis=1).to_string(index=False))
+        
+        sensitivity_path = output_dir / "weight_sensitivity.csv"
+        pd.concat([gold_df[['id', 'name']], sensitivity], axis=1).to_csv(sensitivity_path, index=False)
+        print(f"Sensitivity report saved to: {sensitivity_path}")
+    
     print("\n=== Pipeline Complete! ===")
     print("The bronze → silver → gold pipeline has been successfully implemented locally:")
     print("1. Bronze Layer: Raw CSV data ingestion")
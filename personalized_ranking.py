@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Batch Personalized Ranking
+
+Ranks the gold listings for many user profiles at once: affordability is
+recomputed per budget, per-profile weights and hard filters are applied, and
+the top-K listings per user are picked with matrix operations and partial
+sorts. Profiles use the app's UserPreferences shape plus a user_id.
+"""
+
+import argparse
+import json
+import logging
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from databricks_pipeline import SCORE_WEIGHTS
+
+logger = logging.getLogger(__name__)
+
+# Listing feature bits used for hard filters; a profile passes a listing only
+# if every bit it requires is set for that listing
+FEATURE_BITS = {
+    'step_free': 1 << 0,
+    'elevator': 1 << 1,
+    'wide_doorways': 1 << 2,
+    'accessible_bathroom': 1 << 3,
+    'accessible_parking': 1 << 4,
+    'accepts_international': 1 << 5,
+    'no_ssn_ok': 1 << 6,
+    'cosigner_ok': 1 << 7
+}
+
+# UserPreferences.accessibility_needs ids -> required feature bits; needs with no
+# listing data behind them (visual/hearing support) do not filter
+ACCESSIBILITY_NEEDS = {
+    'step_free': FEATURE_BITS['step_free'],
+    'elevator': FEATURE_BITS['elevator'],
+    'wide_doorways': FEATURE_BITS['wide_doorways'],
+    'accessible_bathroom': FEATURE_BITS['accessible_bathroom'],
+    'accessible_parking': FEATURE_BITS['accessible_parking'],
+    'wheelchair': FEATURE_BITS['step_free'] | FEATURE_BITS['wide_doorways']
+}
+
+WIDE_DOORWAY_CM = 81
+WINTER_COMMUTE_FACTOR = 0.9
+# Listings x profiles scored per block, bounding the score matrix to ~32 MB of float32
+BLOCK_ELEMENTS = 8_000_000
+
+def _listing_arrays(gold_df: pd.DataFrame) -> dict:
+    """Per-listing vectors needed for ranking, taken once from the gold frame"""
+    subscores = pd.DataFrame(gold_df['subscores'].tolist(), index=gold_df.index)
+
+    def flag(column):
+        return gold_df[column].fillna(False).to_numpy(bool) if column in gold_df else np.zeros(len(gold_df), bool)
+
+    features = np.zeros(len(gold_df), dtype=np.int64)
+    for name, column in [('step_free', 'step_free'), ('elevator', 'elevator'), ('accessible_bathroom', 'acc_bath'),
+                         ('accessible_parking', 'acc_parking'), ('accepts_international', 'accepts_international'),
+                         ('no_ssn_ok', 'no_ssn_ok'), ('cosigner_ok', 'cosigner_ok')]:
+        features |= np.where(flag(column), FEATURE_BITS[name], 0)
+    doorway = gold_df['doorway_width_cm'].fillna(0).to_numpy(float)
+    features |= np.where(doorway >= WIDE_DOORWAY_CM, FEATURE_BITS['wide_doorways'], 0)
+
+    return {
+        'id': gold_df['id'].to_numpy(),
+        'total_cost': (gold_df['rent'].fillna(0) + gold_df['avg_utils'].fillna(0) + gold_df['deposit'].fillna(0)).to_numpy(np.float32),
+        'rent': gold_df['rent'].to_numpy(np.float32),
+        'bedrooms': gold_df['bedrooms'].to_numpy(np.float32),
+        'walk_min': gold_df['walk_min'].to_numpy(np.float32),
+        'bus_headway_min': gold_df['bus_headway_min'].to_numpy(np.float32),
+        'features': features,
+        # Budget-independent subscores in SCORE_WEIGHTS order after affordability, which is recomputed
+        'fixed': subscores[list(SCORE_WEIGHTS)[1:]].to_numpy(np.float32)
+    }
+
+def _profile_arrays(profiles: pd.DataFrame) -> dict:
+    """Per-profile vectors: budgets, normalized weights, hard-filter thresholds and required feature bits"""
+    flat = pd.json_normalize(profiles.to_dict('records'))
+    n = len(flat)
+
+    def column(name, default):
+        return flat[name].fillna(default) if name in flat else pd.Series(default, index=flat.index)
+
+    weights = np.column_stack([column(f'weights.{c}', w).to_numpy(np.float32) for c, w in SCORE_WEIGHTS.items()])
+    weights /= weights.sum(axis=1, keepdims=True)
+    # Winter penalty scales the commute subscore, i.e. its effective weight
+    winter = column('commute_preferences.winter_penalty', False).to_numpy(bool)
+    weights[winter, list(SCORE_WEIGHTS).index('commute')] *= WINTER_COMMUTE_FACTOR
+
+    required = np.zeros(n, dtype=np.int64)
+    for i, needs in enumerate(flat['accessibility_needs'] if 'accessibility_needs' in flat else []):
+        for need in needs if isinstance(needs, (list, tuple, np.ndarray)) else []:
+            required[i] |= ACCESSIBILITY_NEEDS.get(need, 0)
+    for key, bit in [('international_student', 'accepts_international'), ('no_ssn', 'no_ssn_ok'), ('needs_cosigner', 'cosigner_ok')]:
+        required |= np.where(column(f'inclusivity_needs.{key}', False).to_numpy(bool), FEATURE_BITS[bit], 0)
+
+    def limit(name):
+        # Missing or non-positive limits mean "no limit"
+        values = column(name, np.inf).to_numpy(np.float32)
+        return np.where(values > 0, values, np.inf).astype(np.float32)
+
+    return {
+        'user_id': flat['user_id'].to_numpy() if 'user_id' in flat else flat.index.to_numpy(),
+        'budget': column('budget', 2000).to_numpy(np.float32),
+        'weights': weights,
+        'max_rent': limit('max_rent'),
+        'min_bedrooms': column('bedrooms', 0).to_numpy(np.float32),
+        'max_walk_time': limit('commute_preferences.max_walk_time'),
+        'max_bus_frequency': limit('commute_preferences.max_bus_frequency'),
+        'required': required
+    }
+
+def rank_for_profiles(gold_df: pd.DataFrame, profiles: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    """
+    Top-k listings per profile, as a long frame of (user_id, rank, id, score).
+
+    Profiles are scored in blocks so the profiles x listings score matrix stays
+    bounded; profiles with fewer than k eligible listings get fewer rows.
+    """
+    listings = _listing_arrays(gold_df)
+    users = _profile_arrays(profiles)
+    n_listings, n_users = len(listings['id']), len(users['budget'])
+    k = min(k, n_listings)
+    if k == 0 or n_users == 0:
+        return pd.DataFrame(columns=['user_id', 'rank', 'id', 'score'])
+
+    block = max(1, BLOCK_ELEMENTS // max(n_listings, 1))
+    results = []
+    for start in range(0, n_users, block):
+        rows = slice(start, min(start + block, n_users))
+        weights = users['weights'][rows]
+
+        # Affordability recomputed per budget: max(0, 100 - total_cost / budget * 100);
+        # weights column 0 is affordability, the rest line up with listings['fixed']
+        affordability = np.maximum(0, 100 - listings['total_cost'][None, :] / users['budget'][rows, None] * 100)
+        scores = weights[:, :1] * affordability + weights[:, 1:] @ listings['fixed'].T
+
+        eligible = (listings['features'][None, :] & users['required'][rows, None]) == users['required'][rows, None]
+        eligible &= listings['rent'][None, :] <= users['max_rent'][rows, None]
+        eligible &= listings['bedrooms'][None, :] >= users['min_bedrooms'][rows, None]
+        eligible &= listings['walk_min'][None, :] <= users['max_walk_time'][rows, None]
+        eligible &= listings['bus_headway_min'][None, :] <= users['max_bus_frequency'][rows, None]
+        scores = np.where(eligible, scores, -np.inf)
+
+        # Partial sort for the top k, then order just those k
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        keep = np.isfinite(top_scores)
+        user_index, rank = np.nonzero(keep)
+        results.append(pd.DataFrame({
+            'user_id': users['user_id'][rows][user_index],
+            'rank': rank + 1,
+            'id': listings['id'][top[keep]],
+            'score': top_scores[keep].astype(float).round(2)
+        }))
+
+    return pd.concat(results, ignore_index=True)
+
+def main(argv: List[str] = None):
+    """Nightly personalized digests: rank gold listings for every profile in one vectorized job"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Batch personalized ranking of gold listings")
+    parser.add_argument("--profiles", required=True, help="JSON array of UserPreferences objects with user_id")
+    parser.add_argument("--gold", default="output/housing_di_scores.parquet", help="Gold Parquet from DIPipeline")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", default="output/personalized_rankings.parquet")
+    args = parser.parse_args(argv)
+
+    gold_df = pd.read_parquet(args.gold)
+    with open(args.profiles) as f:
+        profiles = pd.DataFrame(json.load(f))
+
+    rankings = rank_for_profiles(gold_df, profiles, k=args.top_k)
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    rankings.to_parquet(args.output, index=False)
+    logger.info(f"✅ Ranked {len(gold_df)} listings for {len(profiles)} profiles -> {args.output}")
+    return rankings
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Lazy Polars Engine
+
+An alternate engine for DIPipeline that expresses bronze → silver → gold as one
+Polars lazy query instead of pandas frames and a row-wise apply. Type parsing,
+validation rules and D&I scoring are all expressions, so Polars pushes column
+projections and filters down into the CSV/Parquet scan and runs the plan on
+every core.
+
+Silver stays lazy: gold_layer collects the gold rows, the quarantine and the
+rule counts in one pass and hands back pandas frames, so export_results,
+ScoreHistory and the sharded merge work unchanged. gold_plan() exposes the lazy
+gold query for narrow reads such as a scores-only refresh.
+
+On feeds both engines parse the same way, the output is the pandas engine's in
+--low-memory mode (standardized column names, source columns not duplicated):
+the same rows, dtypes and published values. Scores, subscores and campus columns
+are rounded, divided and formatted exactly as Python and numpy do, so di_score
+and score_breakdown are identical, not merely close. The CSV readers differ in
+edge cases only: Polars truncates ragged lines rather than skipping them, keeps
+backslash escapes as-is and refuses a feed it cannot parse.
+
+Run this module with --data-path to time both engines on a feed and check
+that their outputs match.
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from databricks_pipeline import (DEFAULT_TIER, EARTH_RADIUS_KM, FALSE_VALUES, MAX_WALK_SPEED_KMH, SCORE_COLUMNS,
+                                 SCORE_WEIGHTS, TIER_THRESHOLDS, TRUE_VALUES, VALIDATION_RANGES, WALKING_SPEED_KMH,
+                                 DIPipeline, parse_campuses)
+
+try:
+    import polars as pl
+except ImportError:  # polars is optional; only the lazy engine needs it
+    pl = None
+
+logger = logging.getLogger(__name__)
+
+# Rows Polars samples to infer the types of columns silver does not parse itself
+INFER_SCHEMA_ROWS = 10000
+# Tokens pandas.read_csv reads as missing by default; only the parsed columns look for them,
+# since matching them in every text column doubles the cost of the scan
+CSV_NULL_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                   '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+RAW_PREFIX = '_raw_'
+PARSED_PREFIX = '_parsed_'
+BAD_PREFIX = '_bad_'
+RULE_PREFIX = '_rule_'
+CLAMPED_PREFIX = '_clamped_'
+INT_FLAG_PREFIX = '_int_'
+# Gold columns _campus_expressions adds per campus; published like SCORE_COLUMNS
+CAMPUS_SCORE_PREFIXES = ('dist_km_', 'walk_min_', 'safety_', 'commute_', 'di_score_')
+# Relative difference compare_outputs accepts in parsed (not published score) float columns
+PARSE_RTOL = 1e-15
+
+def _format_tenths(values: "pl.Series") -> "pl.Series":
+    """f"{x:.1f}" of every (non-negative) value without a Python call per row"""
+    tenths = values * 10
+    n = tenths.round(0).cast(pl.Int64)
+    text = pl.select(pl.concat_str([(n // 10).cast(pl.String), pl.lit('.'), (n % 10).cast(pl.String)])).to_series()
+    # x * 10 is inexact, so values close to a tie are left to Python's correctly rounded format
+    near_tie = ((tenths - tenths.floor()) - 0.5).abs() < 1e-6
+    if near_tie.any():
+        positions = near_tie.arg_true()
+        text = text.scatter(positions, [f"{v:.1f}" for v in values.gather(positions)])
+    return text
+
+def _round(values: "pl.Series", digits: int) -> "pl.Series":
+    """round(x, digits) as Python rounds floats, whose ties Polars' round resolves differently"""
+    x = values.to_numpy()
+    scaled = x * 10 ** digits
+    rounded = np.rint(scaled) / 10 ** digits
+    # x * 10**digits is inexact, so values close to a tie are left to Python
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    rounded[near_tie] = [round(v, digits) for v in x[near_tie].tolist()]
+    return pl.Series(values.name, rounded)
+
+def _round_expr(expr: "pl.Expr", digits: int) -> "pl.Expr":
+    return expr.map_batches(lambda s: _round(s, digits), return_dtype=pl.Float64)
+
+def _np_round(expr: "pl.Expr", digits: int) -> "pl.Expr":
+    """ndarray.round(digits): scale, round half to even, scale back"""
+    return _divide((expr * 10 ** digits).round(0), 10 ** digits)
+
+def _divide(expr: "pl.Expr", divisor: float) -> "pl.Expr":
+    """expr / divisor rounded as numpy does; Polars multiplies by the reciprocal of a scalar divisor"""
+    return expr / (pl.int_range(pl.len()) * 0 + divisor).cast(pl.Float64)
+
+class PolarsDIPipeline(DIPipeline):
+    """DIPipeline with the same stage methods, evaluated as a lazy Polars query"""
+
+    def __init__(self, data_path: str = "data/sample_listings.csv", low_memory: bool = False,
+                 project_columns: bool = False, campuses: Optional[Dict[str, Tuple[float, float]]] = None,
+                 validate: bool = True):
+        if pl is None:
+            raise ImportError("The lazy engine needs polars: pip install polars")
+        # The lazy plan never copies frames and only reads the columns a query uses,
+        # so low_memory and project_columns have nothing left to do
+        if low_memory or project_columns:
+            logger.warning("The polars engine ignores --low-memory and --project-columns; "
+                           "its output always has the low-memory schema")
+        super().__init__(data_path, campuses=campuses, validate=validate)
+        self._integer_sources = {}
+        self._dtype_plan = None
+        self._quarantine_plan = None
+        self._counts_plan = None
+        self._gold_plan = None
+        self._clamped_subscores = {}
+
+    def bronze_layer(self) -> "pl.LazyFrame":
+        """Bronze Layer: Lazy scan of the raw feed"""
+        logger.info("🟤 Bronze Layer: Planning raw data scan...")
+
+        if not os.path.exists(self.data_path):
+            logger.error(f"Data file not found: {self.data_path}")
+            self._use_sample_data()
+        elif self.data_path.endswith('.parquet'):
+            self.bronze_df = pl.scan_parquet(self.data_path)
+        else:
+            # Columns silver parses are read as text so one bad value cannot fail the scan
+            header = pl.read_csv(self.data_path, n_rows=0).columns
+            parsed = set(self.NUMERIC_COLUMNS) | set(self.BOOLEAN_COLUMNS)
+            overrides = {c: pl.String for c in header if self.COLUMN_MAPPING.get(c) in parsed}
+            self.bronze_df = pl.scan_csv(self.data_path, quote_char='"', schema_overrides=overrides,
+                                         infer_schema_length=INFER_SCHEMA_ROWS,
+                                         truncate_ragged_lines=True)
+        return self.bronze_df
+
+    def _use_sample_data(self):
+        self.bronze_df = pl.from_pandas(self._create_sample_data()).lazy()
+        self.silver_df = self._gold_plan = None
+
+    def silver_layer(self) -> "pl.LazyFrame":
+        """Silver Layer: Parsing, validation and default fills as lazy expressions"""
+        logger.info("🟡 Silver Layer: Planning cleaning and validation...")
+
+        if self.bronze_df is None:
+            self.bronze_layer()
+
+        schema = self.bronze_df.collect_schema()
+        mapping = {old: new for old, new in self.COLUMN_MAPPING.items() if old in schema and old != new}
+        lf = self.bronze_df.rename(mapping)
+        schema = lf.collect_schema()
+        columns = schema.names()
+
+        # Values are parsed into temporary columns first, so the bad-value checks
+        # can still compare them with the raw text
+        parsed, bad_types = {}, {}
+        self._integer_sources = {}
+        for col in self.NUMERIC_COLUMNS:
+            if col not in schema:
+                continue
+            raw = pl.col(col)
+            if schema[col] == pl.String:
+                parsed[col] = raw.str.strip_chars().cast(pl.Float64, strict=False).fill_nan(None)
+                # Missing-value tokens and blanks parse to null without being bad values
+                bad_types[col] = (pl.col(PARSED_PREFIX + col).is_null() & raw.is_not_null()
+                                  & ~raw.is_in(CSV_NULL_VALUES) & (raw.str.strip_chars() != ''))
+                # pandas keeps a column as integers only if every raw value is one
+                self._integer_sources[col] = raw.str.strip_chars().cast(pl.Int64, strict=False).is_not_null().all()
+            else:
+                parsed[col] = raw.cast(pl.Float64).fill_nan(None)
+                self._integer_sources[col] = pl.lit(schema[col].is_integer()) & raw.is_not_null().all()
+        for col in self.BOOLEAN_COLUMNS:
+            if col not in schema or schema[col] == pl.Boolean:
+                continue
+            raw = pl.col(col).cast(pl.String)
+            lowered = raw.str.to_lowercase()
+            parsed[col] = lowered.is_in(TRUE_VALUES).fill_null(False)
+            bad_types[col] = (~pl.col(PARSED_PREFIX + col) & raw.is_not_null()
+                              & ~raw.is_in(CSV_NULL_VALUES) & ~lowered.is_in(FALSE_VALUES))
+
+        self._dtype_plan = lf.select([flag.alias(INT_FLAG_PREFIX + col) for col, flag in self._integer_sources.items()])
+        lf = lf.with_columns([expr.alias(PARSED_PREFIX + col) for col, expr in parsed.items()])
+
+        raw_columns = [RAW_PREFIX + col for col in bad_types]
+        if self.validate:
+            # Unparseable values become null, so their raw text is carried along for the quarantine
+            lf = lf.with_columns([bad.fill_null(False).alias(BAD_PREFIX + col) for col, bad in bad_types.items()])
+            lf = lf.with_columns([pl.when(pl.col(BAD_PREFIX + col)).then(pl.col(col).cast(pl.String)).alias(RAW_PREFIX + col)
+                                  for col in bad_types])
+        lf = lf.with_columns([pl.col(PARSED_PREFIX + col).alias(col) for col in parsed])
+
+        if self.validate:
+            rules = self._validation_rules(lf.collect_schema(), list(bad_types))
+            # Each rule is evaluated once, before any filter changes what duplicate_id sees
+            lf = lf.with_columns([rule.alias(RULE_PREFIX + name) for name, rule in rules.items()])
+            rules = {name: pl.col(RULE_PREFIX + name) for name in rules}
+            failing = pl.any_horizontal(list(rules.values())) if rules else pl.lit(False)
+            reasons = pl.concat_str([pl.when(rule).then(pl.lit(name)) for name, rule in rules.items()],
+                                    separator=';', ignore_nulls=True) if rules else pl.lit('')
+            self._quarantine_plan = lf.filter(failing).with_columns(reason_codes=reasons).select(
+                columns + raw_columns + ['reason_codes'])
+            self._counts_plan = lf.select([rule.sum().alias(name) for name, rule in rules.items()])
+            lf = lf.filter(~failing)
+
+        # Fill missing values
+        self.silver_df = lf.select(columns).with_columns(
+            [pl.col(col).fill_null(default) for col, default in self.MISSING_DEFAULTS.items() if col in columns])
+        return self.silver_df
+
+    def _validation_rules(self, schema, bad_type_columns: List[str]) -> Dict[str, "pl.Expr"]:
+        """The rules of DIPipeline._validate, in the same order, as boolean expressions"""
+        rules = {f'bad_type:{col}': pl.col(BAD_PREFIX + col) for col in bad_type_columns}
+        if 'id' in schema:
+            rules['missing_id'] = pl.col('id').is_null()
+            # Every occurrence but the last of a repeated id, as duplicated(keep='last')
+            rules['duplicate_id'] = ~pl.col('id').is_last_distinct() & pl.col('id').is_not_null()
+        if 'rent' in schema:
+            unparsed = pl.col(BAD_PREFIX + 'rent') if 'rent' in bad_type_columns else pl.lit(False)
+            rules['missing_rent'] = pl.col('rent').is_null() & ~unparsed
+        for col, (low, high) in VALIDATION_RANGES.items():
+            if col in schema:
+                rules[f'out_of_range:{col}'] = ((pl.col(col) < low) | (pl.col(col) > high)).fill_null(False)
+        if 'lat' in schema and 'lng' in schema:
+            rules['partial_coordinates'] = pl.col('lat').is_null() != pl.col('lng').is_null()
+        if 'dist_to_campus_km' in schema and 'walk_min' in schema:
+            walk = pl.col('walk_min')
+            speed = pl.col('dist_to_campus_km') / _divide(walk, 60)
+            rules['walk_time_distance_mismatch'] = ((walk > 0) & (speed > MAX_WALK_SPEED_KMH)).fill_null(False)
+        return rules
+
+    def gold_plan(self) -> "pl.LazyFrame":
+        """Lazy gold query; select a few columns from it to read and score only what they need"""
+        if self._gold_plan is None:
+            if self.silver_df is None:
+                self.silver_layer()
+            schema = self.silver_df.collect_schema()
+            self._gold_plan = self.silver_df.with_columns(self._score_expressions(schema)).with_columns(
+                total_monthly_cost=pl.col('rent') + pl.col('avg_utils'))
+            self._gold_plan = self._gold_plan.with_columns(
+                affordability_ratio=_divide(pl.col('total_monthly_cost'), 2000))  # Normalize to $2000 budget
+            if self.campuses:
+                self._gold_plan = self._gold_plan.with_columns(self._campus_expressions())
+        return self._gold_plan
+
+    def gold_layer(self) -> pd.DataFrame:
+        """Gold Layer: Collect scores, quarantine and rule counts in one pass"""
+        logger.info("🟢 Gold Layer: Calculating D&I scores...")
+
+        gold = self.gold_plan()
+        clamped = [flag.alias(CLAMPED_PREFIX + name) for name, flag in self._clamped_subscores.items()]
+        plans = [gold.with_columns(clamped), self._dtype_plan]
+        if self.validate:
+            plans += [self._quarantine_plan, self._counts_plan]
+        # The plans share the scan and silver parsing, which Polars runs once for all of them
+        try:
+            frames = pl.collect_all(plans)
+        except pl.exceptions.ComputeError as e:
+            # The feed is only read here, so this is where an unreadable CSV surfaces. Never
+            # substitute sample listings for a real feed
+            raise ValueError(f"The polars engine could not parse {self.data_path}; the pandas engine "
+                             f"skips malformed lines instead (--engine pandas): {e}") from e
+
+        integer_flags = frames[1].row(0, named=True)
+        integer_columns = [col for col in self._integer_sources if integer_flags[INT_FLAG_PREFIX + col]]
+        clamped_names = [c.meta.output_name() for c in clamped]
+        self.gold_df = self._to_pandas(frames[0].drop(clamped_names), integer_columns)
+        subscores = self.gold_df['subscores'].to_numpy()
+        for name, flags in frames[0].select(clamped_names).to_dict().items():
+            name = name[len(CLAMPED_PREFIX):]
+            if name == 'safety' and 'dist_to_campus_km' in integer_columns:
+                flags = pl.repeat(True, len(flags), eager=True)
+            for position in flags.arg_true().to_list():
+                subscores[position][name] = int(subscores[position][name])
+        if self.validate:
+            self._collect_quarantine(frames[2], integer_columns)
+            # bad_type rules only exist in pandas for columns that had a bad value
+            self.validation_counts = {rule: int(count) for rule, count in frames[3].row(0, named=True).items()
+                                      if count or not rule.startswith('bad_type:')}
+            violated = {rule: count for rule, count in self.validation_counts.items() if count}
+            if len(self.quarantine_df):
+                logger.warning(f"🚧 Quarantined {len(self.quarantine_df)} of "
+                               f"{len(self.quarantine_df) + len(self.gold_df)} listings: {violated}")
+
+        logger.info(f"✅ Gold: Calculated D&I scores for {len(self.gold_df)} listings")
+        return self.gold_df
+
+    def _to_pandas(self, frame: "pl.DataFrame", integer_columns: List[str]) -> pd.DataFrame:
+        """pandas frame with the dtypes the pandas engine infers for the same feed"""
+        casts = [pl.col(col).cast(pl.Int64) for col in integer_columns if col in frame.columns]
+        if {'rent', 'avg_utils'} <= set(integer_columns) and 'total_monthly_cost' in frame.columns:
+            casts.append(pl.col('total_monthly_cost').cast(pl.Int64))
+        return frame.with_columns(casts).to_pandas()
+
+    def _collect_quarantine(self, frame: "pl.DataFrame", integer_columns: List[str]):
+        """Quarantined rows with the raw text of their unparseable values as JSON, as in DIPipeline._validate"""
+        raw_columns = [c for c in frame.columns if c.startswith(RAW_PREFIX)]
+        raw = frame.select(raw_columns).rows() if raw_columns else [()] * len(frame)
+        names = [c[len(RAW_PREFIX):] for c in raw_columns]
+        frame = frame.drop(raw_columns).with_columns(
+            raw_values=pl.Series([json.dumps({n: v for n, v in zip(names, row) if v is not None}) for row in raw],
+                                 dtype=pl.String))
+        self.quarantine_df = self._to_pandas(frame, integer_columns)
+
+    def _score_expressions(self, schema) -> List["pl.Expr"]:
+        """The scores of DIPipeline._calculate_di_score as column expressions"""
+        def flag(col):
+            return pl.col(col).fill_null(False) if col in schema else pl.lit(False)
+
+        def value(col, default):
+            # `row.get(col, default) or default`: missing and zero both fall back
+            if col not in schema:
+                return pl.lit(float(default))
+            return pl.when(pl.col(col) == 0).then(pl.lit(float(default))).otherwise(pl.col(col))
+
+        total_cost = pl.col('rent') + value('avg_utils', 0) + value('deposit', 0)
+        unclamped_affordability = 100 - _divide(total_cost, 2000) * 100
+        affordability = pl.max_horizontal(pl.lit(0.0), unclamped_affordability)
+
+        doorway = value('doorway_width_cm', 0)
+        accessibility_points = [
+            ('step-free entry', flag('step_free'), 25),
+            ('elevator access', flag('elevator'), 25),
+            ('ADA-compliant doorways', (doorway >= 91).fill_null(False), 25),  # 36 inches
+            ('wide doorways', ((doorway >= 81) & (doorway < 91)).fill_null(False), 15),  # 32 inches
+            ('accessible bathroom', flag('acc_bath'), 25),
+            ('accessible parking', flag('acc_parking'), 25)
+        ]
+        inclusivity_points = [
+            ('accepts international students', flag('accepts_international'), 25),
+            ('no SSN required', flag('no_ssn_ok'), 25),
+            ('allows co-signers', flag('cosigner_ok'), 25),
+            ('anti-discrimination policy', flag('anti_disc_policy'), 25)
+        ]
+        accessibility = pl.sum_horizontal([pl.when(hit).then(points).otherwise(0) for _, hit, points in accessibility_points])
+        inclusivity = pl.sum_horizontal([pl.when(hit).then(points).otherwise(0) for _, hit, points in inclusivity_points])
+
+        unclamped_safety = 100 - value('dist_to_campus_km', 2) * 15
+        safety = pl.max_horizontal(pl.lit(0.0), unclamped_safety)
+        safety = pl.min_horizontal(pl.lit(100.0), safety + pl.when(flag('well_lit')).then(20).otherwise(0))
+        unclamped_commute = 100 - (value('walk_min', 20) + value('bus_headway_min', 20)) / 2
+        commute = pl.max_horizontal(pl.lit(0.0), unclamped_commute)
+
+        # max(0, x) and min(100, x) return their int bound when they clamp, and the pandas
+        # engine's subscore dicts keep those ints (exported as 0 rather than 0.0); safety is
+        # also an int wherever the distance is, including the `or 2` default
+        distance_defaulted = (pl.col('dist_to_campus_km') == 0).fill_null(False) if 'dist_to_campus_km' in schema else pl.lit(True)
+        self._clamped_subscores = {
+            'affordability': ~(unclamped_affordability > 0).fill_null(False),
+            'safety': ~(unclamped_safety > 0).fill_null(False) | (safety >= 100) | distance_defaulted,
+            'commute': ~(unclamped_commute > 0).fill_null(False)
+        }
+
+        subscores = {
+            'affordability': affordability,
+            'accessibility': accessibility.cast(pl.Int64),
+            'safety': safety,
+            'commute': commute,
+            'inclusivity': inclusivity.cast(pl.Int64)
+        }
+        # Summed left to right like the pandas engine, so floating-point results are identical
+        overall = None
+        for name, weight in SCORE_WEIGHTS.items():
+            term = weight * subscores[name]
+            overall = term if overall is None else overall + term
+
+        tier = pl.lit(DEFAULT_TIER)
+        for threshold, name in reversed(TIER_THRESHOLDS):
+            tier = pl.when(overall >= threshold).then(pl.lit(name)).otherwise(tier)
+
+        breakdown = []
+        for i, name in enumerate(SCORE_WEIGHTS):
+            breakdown += [pl.lit(f"{', ' if i else ''}{name.capitalize()}: "),
+                          subscores[name].cast(pl.Float64).map_batches(_format_tenths, return_dtype=pl.String)]
+
+        def feature_list(points, fallback):
+            joined = pl.concat_str([pl.when(hit).then(pl.lit(text)) for text, hit, _ in points],
+                                   separator=', ', ignore_nulls=True)
+            return pl.when(joined == '').then(pl.lit(fallback)).otherwise(joined)
+
+        return [
+            _round_expr(overall, 2).alias('di_score'),
+            # Point subscores stay integers, as in the pandas engine's dicts
+            pl.struct(**{name: expr if name in ('accessibility', 'inclusivity') else _round_expr(expr, 2)
+                         for name, expr in subscores.items()}).alias('subscores'),
+            tier.alias('score_tier'),
+            pl.concat_str(breakdown).alias('score_breakdown'),
+            feature_list(accessibility_points, 'Limited accessibility features').alias('accessibility_features'),
+            feature_list(inclusivity_points, 'Limited inclusive features').alias('inclusive_features')
+        ]
+
+    def _campus_expressions(self) -> List["pl.Expr"]:
+        """The columns of DIPipeline._score_campuses as expressions, one set per campus"""
+        lat, lng = pl.col('lat').radians(), pl.col('lng').radians()
+        well_lit = pl.col('well_lit').fill_null(False) if 'well_lit' in self.silver_df.collect_schema() else pl.lit(False)
+        subscore = pl.col('subscores').struct.field
+        base = sum(SCORE_WEIGHTS[c] * subscore(c) for c in ('affordability', 'accessibility', 'inclusivity'))
+
+        columns = []
+        for name, (campus_lat, campus_lng) in self.campuses.items():
+            campus_lat, campus_lng = np.radians(campus_lat), np.radians(campus_lng)
+            a = (((campus_lat - lat) / 2).sin() ** 2
+                 + lat.cos() * np.cos(campus_lat) * ((campus_lng - lng) / 2).sin() ** 2)
+            distance = 2 * EARTH_RADIUS_KM * a.sqrt().arcsin()
+            walk_time = _divide(distance, WALKING_SPEED_KMH) * 60
+            # Listings without coordinates fall back to the feed's single-campus values
+            distance = pl.coalesce(distance, pl.col('dist_to_campus_km'))
+            walk_time = pl.coalesce(walk_time, pl.col('walk_min'))
+            # Zero values take the same fallbacks as the feed-campus scores
+            distance = pl.when(distance == 0).then(2.0).otherwise(distance)
+            walk_time = pl.when(walk_time == 0).then(20.0).otherwise(walk_time)
+            bus_headway = pl.when(pl.col('bus_headway_min') == 0).then(20.0).otherwise(pl.col('bus_headway_min'))
+            safety = pl.min_horizontal(pl.lit(100.0), pl.max_horizontal(pl.lit(0.0), 100 - distance * 15)
+                                       + pl.when(well_lit).then(20).otherwise(0))
+            commute = pl.max_horizontal(pl.lit(0.0), 100 - (walk_time + bus_headway) / 2)
+            overall = base + SCORE_WEIGHTS['safety'] * safety + SCORE_WEIGHTS['commute'] * commute
+            columns += [
+                _np_round(distance, 3).alias(f'dist_km_{name}'),
+                _np_round(walk_time, 1).alias(f'walk_min_{name}'),
+                _np_round(safety, 2).alias(f'safety_{name}'),
+                _np_round(commute, 2).alias(f'commute_{name}'),
+                _np_round(overall, 2).alias(f'di_score_{name}')
+            ]
+        return columns
+
+def _is_published_score(col: str) -> bool:
+    return col in SCORE_COLUMNS or col.startswith(CAMPUS_SCORE_PREFIXES)
+
+def _dtype_family(values: pd.Series) -> str:
+    # object and str columns of text compare as the same type
+    return 'text' if pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values) else str(values.dtype)
+
+def compare_outputs(expected: pd.DataFrame, actual: pd.DataFrame) -> Dict[str, str]:
+    """Columns whose values differ between two gold (or quarantine) frames; empty when they match
+
+    Published scores (SCORE_COLUMNS and the per-campus columns) must be equal. Other float
+    columns may differ by PARSE_RTOL, as the CSV readers can round a decimal one ulp apart.
+    """
+    mismatches = {}
+    for col in sorted(set(expected.columns) | set(actual.columns)):
+        if col not in expected.columns or col not in actual.columns:
+            mismatches[col] = 'missing from ' + ('pandas' if col not in expected.columns else 'polars')
+            continue
+        left, right = expected[col].reset_index(drop=True), actual[col].reset_index(drop=True)
+        if len(left) != len(right):
+            mismatches[col] = f'{len(left)} vs {len(right)} rows'
+        elif _dtype_family(left) != _dtype_family(right):
+            mismatches[col] = f'{left.dtype} vs {right.dtype}'
+        else:
+            same = left.astype(object).eq(right.astype(object)).to_numpy(bool, copy=True)
+            if pd.api.types.is_float_dtype(left) and not _is_published_score(col):
+                same |= np.isclose(left.to_numpy(float), right.to_numpy(float), rtol=PARSE_RTOL, atol=0)
+            differs = ~(same | (left.isna() & right.isna()).to_numpy())
+            if differs.any():
+                mismatches[col] = f'{int(differs.sum())} rows differ'
+    return mismatches
+
+def benchmark(data_path: str, campuses: Optional[Dict[str, Tuple[float, float]]] = None, repeat: int = 3) -> Dict:
+    """Best-of-repeat seconds of both engines on one feed, a scores-only lazy query and a parity check"""
+    def best_of(run):
+        best, result = float('inf'), None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            best = min(best, time.perf_counter() - started)
+        return round(best, 3), result
+
+    def run_pandas():
+        pipeline = DIPipeline(data_path, low_memory=True, campuses=campuses)
+        pipeline.gold_layer()
+        return pipeline
+
+    def run_polars():
+        pipeline = PolarsDIPipeline(data_path, campuses=campuses)
+        pipeline.gold_layer()
+        return pipeline
+
+    pandas_seconds, expected = best_of(run_pandas)
+    polars_seconds, actual = best_of(run_polars)
+    # Only the columns these three need are read from the feed and scored
+    scores_seconds, _ = best_of(lambda: PolarsDIPipeline(data_path, campuses=campuses).gold_plan()
+                                .select('id', 'di_score', 'score_tier').collect())
+
+    mismatches = compare_outputs(expected.gold_df, actual.gold_df)
+    if expected.quarantine_df is not None:
+        mismatches.update({f'quarantine.{col}': diff for col, diff
+                           in compare_outputs(expected.quarantine_df, actual.quarantine_df).items()})
+    if expected.validation_counts != actual.validation_counts:
+        mismatches['validation_counts'] = f'{expected.validation_counts} vs {actual.validation_counts}'
+
+    return {
+        'listings': len(actual.gold_df),
+        'pandas_seconds': pandas_seconds,
+        'polars_seconds': polars_seconds,
+        'speedup': round(pandas_seconds / polars_seconds, 1),
+        'polars_scores_only_seconds': scores_seconds,
+        'mismatches': mismatches
+    }
+
+def main(argv: List[str] = None):
+    """Run both engines side by side on one feed and report timings and output parity"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Benchmark the lazy Polars engine against the pandas engine")
+    parser.add_argument("--data-path", default="data/sample_listings.csv", help="Input listings CSV")
+    parser.add_argument("--campus", action="append", default=[], metavar="NAME=LAT,LNG",
+                        help="Score commute and safety against this campus (repeatable)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per engine; the fastest is reported")
+    args = parser.parse_args(argv)
+
+    campuses = parse_campuses(args.campus)
+
+    results = benchmark(args.data_path, campuses, repeat=args.repeat)
+    print(json.dumps(results, indent=2))
+    return results
+
+if __name__ == "__main__":
+    main()
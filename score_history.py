@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Score History
+
+Append-only store of per-listing scores and rents across pipeline runs. Each
+run records only the listings that were inserted, changed or deleted since the
+previous run, as integer deltas against the last recorded values, so storage
+grows with churn instead of catalogue size x runs.
+
+Layout under the store root:
+    deltas/run_date=YYYY-MM-DD/part-<run_id>.parquet   changed rows, sorted by id
+    runs.parquet                                        one catalogue-wide row per run
+    state.parquet                                       latest values, the base for the next diff
+
+Scores are stored in hundredths (gold rounds them to 2 decimals) and rent in whole
+dollars, so summing a listing's deltas reproduces its values exactly.
+
+An append writes its delta part, then runs.parquet, then state.parquet, which
+records the run it reflects and is the commit point. Runs after that one (and
+part files of runs never recorded) are left over from an interrupted append:
+readers ignore them and the next append drops them, so no delta is counted twice.
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+SUBSCORES = ['affordability', 'accessibility', 'safety', 'commute', 'inclusivity']
+# Tracked field -> fixed-point scale of its stored integer value
+FIELD_SCALES = {'di_score': 100, **{name: 100 for name in SUBSCORES}, 'rent': 1}
+DELTA_PREFIX = 'd_'
+# state.parquet schema metadata key holding the last committed run_id
+STATE_RUN_KEY = b'run_id'
+
+def history_frame(gold_df: pd.DataFrame) -> pd.DataFrame:
+    """Tracked fields of a gold frame from either pipeline, indexed by listing id"""
+    frame = pd.DataFrame(index=pd.Index(gold_df['id'].to_numpy(), name='id'))
+    score = gold_df['di_score'] if 'di_score' in gold_df.columns else gold_df['overall_di_score']
+    frame['di_score'] = pd.to_numeric(score, errors='coerce').to_numpy(float)
+    if 'subscores' in gold_df.columns:
+        subscores = pd.DataFrame(gold_df['subscores'].tolist(), columns=SUBSCORES)
+    else:
+        subscores = gold_df[[f'{c}_score' for c in SUBSCORES]].set_axis(SUBSCORES, axis=1)
+    for name in SUBSCORES:
+        frame[name] = pd.to_numeric(subscores[name], errors='coerce').to_numpy(float)
+    frame['rent'] = pd.to_numeric(gold_df['rent'], errors='coerce').to_numpy(float)
+    frame['score_tier'] = gold_df['score_tier'].astype(str).to_numpy()
+    return frame[~frame.index.duplicated(keep='last')]
+
+def _quantize(frame: pd.DataFrame) -> np.ndarray:
+    # Missing values are recorded as 0
+    scales = np.array(list(FIELD_SCALES.values()), dtype=float)
+    return np.round(np.nan_to_num(frame[list(FIELD_SCALES)].to_numpy(float)) * scales).astype(np.int64)
+
+class ScoreHistory:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.deltas_path = self.root / "deltas"
+        self.runs_path = self.root / "runs.parquet"
+        self.state_path = self.root / "state.parquet"
+
+    def _load_state(self) -> pd.DataFrame:
+        if not self.state_path.exists():
+            return pd.DataFrame(columns=list(FIELD_SCALES) + ['score_tier'], index=pd.Index([], name='id'))
+        return pd.read_parquet(self.state_path).set_index('id')
+
+    def _committed_runs(self) -> pd.DataFrame:
+        """runs.parquet up to the run state.parquet was written for"""
+        if not self.runs_path.exists():
+            return pd.DataFrame()
+        runs = pd.read_parquet(self.runs_path)
+        if not self.state_path.exists():
+            return runs.iloc[:0]
+        committed = (pq.read_schema(self.state_path).metadata or {}).get(STATE_RUN_KEY)
+        if committed is None:  # stores written before the state recorded its run
+            return runs
+        last = np.flatnonzero(runs['run_id'].to_numpy() == committed.decode('utf-8'))
+        return runs.iloc[:last[-1] + 1] if len(last) else runs.iloc[:0]
+
+    def _drop_uncommitted(self, runs: pd.DataFrame):
+        """Delete delta parts left by appends that never reached state.parquet"""
+        committed = set(runs['run_id']) if len(runs) else set()
+        for part in self.deltas_path.glob('run_date=*/part-*.parquet'):
+            if part.stem[len('part-'):] not in committed:
+                part.unlink()
+                logger.info(f"🧹 Dropped {part.relative_to(self.root)} from an interrupted append")
+                if not any(part.parent.iterdir()):
+                    part.parent.rmdir()
+
+    def append(self, gold_df: pd.DataFrame, run_at: Optional[datetime] = None) -> Dict:
+        """Record one run: delta rows for every inserted, changed or deleted listing"""
+        run_at = run_at or datetime.now()
+        run_id = run_at.strftime('%Y%m%dT%H%M%S%f')
+        current = history_frame(gold_df)
+        previous = self._load_state()
+        runs = self._committed_runs()
+        if len(runs) and (runs['run_id'] == run_id).any():
+            raise ValueError(f"Run {run_id} is already recorded in {self.root}")
+        self._drop_uncommitted(runs)
+
+        ids = current.index.union(previous.index) if len(previous) else current.index.sort_values()
+        present_now = ids.isin(current.index)
+        present_before = ids.isin(previous.index)
+        current_values = np.zeros((len(ids), len(FIELD_SCALES)), dtype=np.int64)
+        current_values[present_now] = _quantize(current.reindex(ids[present_now]))
+        previous_values = previous.reindex(ids)[list(FIELD_SCALES)].fillna(0).to_numpy(np.int64)
+
+        # A deleted listing's deltas return its values to zero; a reinserted one starts from zero again
+        deltas = current_values - previous_values
+        current_tiers = current['score_tier'].reindex(ids).to_numpy(object)
+        tier_changed = current_tiers != previous['score_tier'].reindex(ids).to_numpy(object)
+        changed = (deltas != 0).any(axis=1) | (tier_changed & present_now) | (present_now != present_before)
+        op = np.select([~present_before, ~present_now], ['insert', 'delete'], 'update')
+
+        # The tier is only stored when it changed; readers forward-fill it
+        columns = {
+            'run_id': pa.array([run_id] * int(changed.sum()), pa.string()),
+            'id': pa.array(ids[changed].to_numpy()),
+            'op': pa.array(op[changed], pa.string())
+        }
+        for j, name in enumerate(FIELD_SCALES):
+            columns[DELTA_PREFIX + name] = pa.array(deltas[changed, j], pa.int32())
+        tiers = np.where((tier_changed & present_now)[changed], current_tiers[changed], None)
+        columns['score_tier'] = pa.array(tiers.tolist(), pa.string())
+
+        partition = self.deltas_path / f"run_date={run_at.date().isoformat()}"
+        partition.mkdir(parents=True, exist_ok=True)
+        pq.write_table(pa.table(columns), partition / f"part-{run_id}.parquet",
+                       use_dictionary=['run_id', 'op', 'score_tier'])
+
+        run = self._run_summary(current, run_id, run_at, op[changed])
+        runs = pd.concat([runs, pd.DataFrame([run])], ignore_index=True)
+        tier_columns = [c for c in runs.columns if c.startswith('tier_')]
+        runs[tier_columns] = runs[tier_columns].fillna(0).astype(np.int64)
+        self._replace(runs, self.runs_path)
+
+        state = pd.DataFrame(current_values[present_now], columns=list(FIELD_SCALES), index=ids[present_now])
+        state['score_tier'] = current_tiers[present_now]
+        self._replace(state.rename_axis('id').reset_index(), self.state_path, {STATE_RUN_KEY: run_id.encode('utf-8')})
+
+        logger.info(f"🕒 Run {run_id}: {run['inserted']} inserted, {run['updated']} updated, "
+                    f"{run['deleted']} deleted, {run['listings'] - run['inserted'] - run['updated']} unchanged")
+        return run
+
+    def _run_summary(self, current: pd.DataFrame, run_id: str, run_at: datetime, ops: np.ndarray) -> Dict:
+        run = {
+            'run_id': run_id,
+            'run_at': pd.Timestamp(run_at),
+            'listings': len(current),
+            'inserted': int((ops == 'insert').sum()),
+            'updated': int((ops == 'update').sum()),
+            'deleted': int((ops == 'delete').sum()),
+            'mean_rent': round(float(current['rent'].mean()), 2),
+            'median_rent': round(float(current['rent'].median()), 2)
+        }
+        for name in ['di_score'] + SUBSCORES:
+            run[f'mean_{name}'] = round(float(current[name].mean()), 2)
+        for tier, count in current['score_tier'].value_counts().items():
+            run[f'tier_{tier}'] = int(count)
+        return run
+
+    @staticmethod
+    def _replace(frame: pd.DataFrame, path: Path, metadata: Optional[Dict[bytes, bytes]] = None):
+        # Write next to the target and rename, so readers never see a partial file
+        staging = path.with_suffix('.tmp')
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if metadata:
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+        pq.write_table(table, staging)
+        staging.replace(path)
+
+    def listing_history(self, listing_id) -> pd.DataFrame:
+        """Values of one listing after every run that changed it; values are NaN after a delete"""
+        runs = self._committed_runs()
+        if not self.deltas_path.exists() or not len(runs):
+            return pd.DataFrame()
+        run_ids = runs['run_id'].tolist()
+        dataset = ds.dataset(self.deltas_path, format='parquet', partitioning='hive')
+        rows = dataset.to_table(filter=(ds.field('id') == listing_id) & ds.field('run_id').isin(run_ids)).to_pandas()
+        order = pd.Series(np.arange(len(run_ids)), index=run_ids)
+        rows = rows.iloc[np.argsort(order.reindex(rows['run_id']).to_numpy(), kind='stable')].reset_index(drop=True)
+
+        history = pd.DataFrame({
+            'run_id': rows['run_id'],
+            'run_date': rows['run_date'].astype(str),
+            'op': rows['op']
+        })
+        deleted = (rows['op'] == 'delete').to_numpy()
+        for name, scale in FIELD_SCALES.items():
+            values = rows[DELTA_PREFIX + name].cumsum().to_numpy(float) / scale
+            history[name] = np.where(deleted, np.nan, values)
+        history['score_tier'] = rows['score_tier'].ffill().where(~deleted)
+        return history
+
+    def trends(self) -> pd.DataFrame:
+        """One row per run: catalogue size, churn, mean scores, rents and tier counts"""
+        return self._committed_runs()
+
+    def storage_bytes(self) -> Dict[str, int]:
+        sizes = {'deltas': sum(p.stat().st_size for p in self.deltas_path.rglob('*.parquet'))}
+        for name, path in (('runs', self.runs_path), ('state', self.state_path)):
+            sizes[name] = path.stat().st_size if path.exists() else 0
+        return sizes
+
+def main(argv: List[str] = None):
+    """Record a gold Parquet file as a run, or query a listing's history and catalogue trends"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Per-listing score history")
+    parser.add_argument("--store", default="output/history", help="History store root")
+    parser.add_argument("--append", metavar="GOLD_PARQUET", default=None, help="Record this gold output as a run")
+    parser.add_argument("--run-at", default=None, help="ISO timestamp of the appended run (default: now)")
+    parser.add_argument("--listing-id", default=None, help="Show how this listing changed across runs")
+    parser.add_argument("--trends", action="store_true", help="Show catalogue-wide trends per run")
+    args = parser.parse_args(argv)
+
+    history = ScoreHistory(args.store)
+    if args.append:
+        run_at = datetime.fromisoformat(args.run_at) if args.run_at else None
+        history.append(pd.read_parquet(args.append), run_at=run_at)
+    if args.listing_id is not None:
+        listing_id = int(args.listing_id) if args.listing_id.lstrip('-').isdigit() else args.listing_id
+        print(history.listing_history(listing_id).to_string(index=False))
+    if args.trends:
+        print(history.trends().to_string(index=False))
+    return history
+
+if __name__ == "__main__":
+    main()
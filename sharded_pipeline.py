@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Region-Sharded Pipeline
+
+Partitions the listings feed by geographic region (a lat/lng grid cell or the
+nearest campus), runs bronze → silver → gold for every shard in its own worker
+process and merges the shard outputs into the global gold artifacts.
+
+Each shard lives in <work-dir>/<shard>/ with its input feed, its gold Parquet
+and a manifest holding a fingerprint of the input and scoring config. Shards
+whose fingerprint is unchanged are not rescored, so replacing one region's
+listings.csv and rerunning only rescores that region before the merge.
+
+The merge concatenates the shard gold rows and exports them with
+DIPipeline.export_results, so summaries are computed over all listings (never
+averaged across shards) and rows are written in global D&I score rank order.
+An id found in several shards keeps only its last occurrence in the feed, as
+silver's duplicate_id rule does in a single run.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from databricks_pipeline import CSV_READ_STRATEGIES, DIPipeline, haversine_matrix, parse_campuses
+
+logger = logging.getLogger(__name__)
+
+SHARD_INPUT = "listings.csv"
+SHARD_GOLD = "gold.parquet"
+SHARD_MANIFEST = "shard.json"
+SHARD_QUARANTINE = "quarantine.parquet"
+# Feed row of the last occurrence of every id in a shard, to resolve ids found in several shards
+SHARD_POSITIONS = "positions.parquet"
+UNLOCATED_SHARD = "unlocated"
+
+DEFAULT_GRID_DEGREES = 0.1
+PARTITION_CHUNK_ROWS = 200000
+
+def shard_keys(chunk: pd.DataFrame, shard_by: str, grid_degrees: float = DEFAULT_GRID_DEGREES,
+               campuses: Optional[Dict[str, Tuple[float, float]]] = None) -> np.ndarray:
+    """Shard name of every raw listing: its grid cell or its nearest campus"""
+    lat = pd.to_numeric(chunk['lat'], errors='coerce').to_numpy(float)
+    lng = pd.to_numeric(chunk['lng'], errors='coerce').to_numpy(float)
+    located = ~(np.isnan(lat) | np.isnan(lng))
+    keys = np.full(len(chunk), UNLOCATED_SHARD, dtype=object)
+    if not located.any():
+        return keys
+
+    if shard_by == "campus":
+        if not campuses:
+            raise ValueError("Sharding by campus needs at least one --campus")
+        names = np.array(list(campuses), dtype=object)
+        coords = np.array(list(campuses.values()), dtype=float)
+        nearest = haversine_matrix(lat[located], lng[located], coords[:, 0], coords[:, 1]).argmin(axis=1)
+        keys[located] = names[nearest]
+    else:
+        cells_lat = np.floor(lat[located] / grid_degrees).astype(np.int64)
+        cells_lng = np.floor(lng[located] / grid_degrees).astype(np.int64)
+        keys[located] = [f"grid_{a}_{b}" for a, b in zip(cells_lat, cells_lng)]
+    return keys
+
+def partition(data_path: str, work_dir: Path, shard_by: str = "grid", grid_degrees: float = DEFAULT_GRID_DEGREES,
+              campuses: Optional[Dict[str, Tuple[float, float]]] = None) -> Dict[str, int]:
+    """Split the feed into one listings.csv per shard, streaming it in chunks; returns rows per shard"""
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    # Same parsing strategies as DIPipeline._read_csv; a failed pass is discarded before the next one
+    for attempt, options in enumerate(CSV_READ_STRATEGIES, start=1):
+        counts, staging, positions = {}, {}, {}
+        try:
+            for chunk in pd.read_csv(data_path, chunksize=PARTITION_CHUNK_ROWS, **options):
+                keys = shard_keys(chunk, shard_by, grid_degrees, campuses)
+                for shard, rows in chunk.groupby(keys, sort=False):
+                    path = work_dir / shard / f"{SHARD_INPUT}.tmp"
+                    if shard not in staging:
+                        path.parent.mkdir(exist_ok=True)
+                        staging[shard] = path
+                    rows.to_csv(path, mode='a' if shard in counts else 'w', header=shard not in counts, index=False)
+                    counts[shard] = counts.get(shard, 0) + len(rows)
+                    positions.setdefault(shard, []).append(
+                        pd.DataFrame({'id': rows['id'].to_numpy(), 'feed_row': rows.index.to_numpy()}))
+            break
+        except pd.errors.ParserError as e:
+            for path in staging.values():
+                path.unlink(missing_ok=True)
+            if attempt == len(CSV_READ_STRATEGIES):
+                raise
+            logger.warning(f"⚠️ Could not parse {data_path} ({e}); retrying with a more lenient reader")
+
+    # Swap the new inputs in only once the whole feed has been split
+    for shard, path in staging.items():
+        rows = pd.concat(positions[shard], ignore_index=True).drop_duplicates('id', keep='last')
+        rows.to_parquet(path.with_name(SHARD_POSITIONS), index=False)
+        path.replace(path.with_name(SHARD_INPUT))
+    # Regions that no longer have listings must not be merged again
+    for stale in list_shards(work_dir):
+        if stale not in counts:
+            shutil.rmtree(work_dir / stale)
+            logger.info(f"🗑️ Removed empty shard {stale}")
+
+    logger.info(f"✅ Partitioned {sum(counts.values())} listings into {len(counts)} shards")
+    return counts
+
+def list_shards(work_dir: Path) -> List[str]:
+    return sorted(p.parent.name for p in work_dir.glob(f"*/{SHARD_INPUT}"))
+
+def shard_fingerprint(shard_dir: Path, config: dict) -> str:
+    """Hash of the shard's input feed and the scoring config it is run with"""
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode('utf-8'))
+    with open(shard_dir / SHARD_INPUT, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def is_stale(shard_dir: Path, config: dict) -> bool:
+    manifest = shard_dir / SHARD_MANIFEST
+    if not manifest.exists() or not (shard_dir / SHARD_GOLD).exists():
+        return True
+    return json.loads(manifest.read_text())['fingerprint'] != shard_fingerprint(shard_dir, config)
+
+def run_shard(shard_dir: str, config: dict) -> dict:
+    """Worker: bronze → silver → gold for one shard, writing its gold Parquet and manifest"""
+    shard_dir = Path(shard_dir)
+    started = time.perf_counter()
+    campuses = {name: tuple(coords) for name, coords in config['campuses'].items()}
+
+    pipeline = DIPipeline(str(shard_dir / SHARD_INPUT), low_memory=config['low_memory'], campuses=campuses,
+                          validate=config['validate'])
+    pipeline.bronze_layer()
+    pipeline.silver_layer()
+    gold_df = pipeline.gold_layer()
+    gold_df.to_parquet(shard_dir / SHARD_GOLD, index=False)
+    (shard_dir / SHARD_QUARANTINE).unlink(missing_ok=True)
+    # Written even when empty, so the merge knows the silver columns of the shard's rows
+    if pipeline.quarantine_df is not None:
+        pipeline.quarantine_df.to_parquet(shard_dir / SHARD_QUARANTINE, index=False)
+
+    manifest = {
+        'shard': shard_dir.name,
+        'fingerprint': shard_fingerprint(shard_dir, config),
+        'listings': len(gold_df),
+        'violations': pipeline.validation_counts,
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    (shard_dir / SHARD_MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+def run_shards(work_dir: Path, config: dict, shards: Optional[List[str]] = None,
+               force: bool = False, workers: Optional[int] = None) -> List[dict]:
+    """Score the requested shards (default: every stale one) in parallel worker processes"""
+    candidates = shards or list_shards(work_dir)
+    missing = [s for s in candidates if not (work_dir / s / SHARD_INPUT).exists()]
+    if missing:
+        raise KeyError(f"Unknown shards: {missing}")
+
+    todo = [s for s in candidates if force or shards or is_stale(work_dir / s, config)]
+    logger.info(f"🧩 Scoring {len(todo)} of {len(candidates)} shards ({len(candidates) - len(todo)} up to date)")
+    if not todo:
+        return []
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        manifests = list(executor.map(run_shard, [str(work_dir / s) for s in todo], [config] * len(todo)))
+    for manifest in manifests:
+        logger.info(f"✅ Shard {manifest['shard']}: {manifest['listings']} listings in {manifest['seconds']}s")
+    return manifests
+
+def _read_quarantine(shard_dir: Path) -> pd.DataFrame:
+    path = shard_dir / SHARD_QUARANTINE
+    return pd.read_parquet(path) if path.exists() else pd.DataFrame({'id': [], 'reason_codes': [], 'raw_values': []})
+
+def _with_duplicate_reason(codes: str) -> str:
+    # Keep DIPipeline._validate's rule order: bad_type:* and missing_id come before duplicate_id
+    parts = codes.split(';')
+    at = sum(p.startswith('bad_type:') or p == 'missing_id' for p in parts)
+    return ';'.join(parts[:at] + ['duplicate_id'] + parts[at:])
+
+def _unify_mixed_columns(frame: pd.DataFrame) -> pd.DataFrame:
+    # Shards infer raw column types separately (bool in one, text in another); Parquet needs one type
+    for column in frame.columns[frame.dtypes == object]:
+        values = frame[column]
+        if values.dropna().map(type).nunique() > 1:
+            frame[column] = values.where(values.isna(), values.astype(str))
+    return frame
+
+def _resolve_duplicates(work_dir: Path, shards: List[str], golds: List[pd.DataFrame],
+                        quarantines: List[pd.DataFrame]) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Apply silver's duplicate_id rule across shards; returns (gold, quarantine, rows newly flagged)
+
+    Each shard already keeps only the last occurrence of an id. An id left in several shards keeps
+    the occurrence that comes last in the feed (by the feed rows recorded at partition time, then by
+    shard name); the others move to quarantine, or get duplicate_id added if already quarantined.
+    Ids without a recorded feed row (a shard input replaced after partitioning) count as newest.
+    """
+    gold_rows, quarantine_rows = [], []
+    for shard, gold, quarantine in zip(shards, golds, quarantines):
+        path = work_dir / shard / SHARD_POSITIONS
+        known = pd.read_parquet(path).set_index('id')['feed_row'] if path.exists() else pd.Series(dtype=float)
+        gold_rows.append(known.reindex(gold['id']).fillna(np.inf).to_numpy(float))
+        quarantine_rows.append(known.reindex(quarantine['id']).fillna(np.inf).to_numpy(float))
+    gold_df = pd.concat(golds, ignore_index=True)
+    quarantine_df = pd.concat(quarantines, ignore_index=True)
+
+    # Only a shard's last occurrence of an id competes across shards; earlier ones already are duplicate_id
+    competing = np.flatnonzero(~quarantine_df['reason_codes'].str.contains('duplicate_id', regex=False).to_numpy())
+    shard_numbers = np.arange(len(shards))
+    candidates = pd.DataFrame({
+        'id': pd.concat([gold_df['id'], quarantine_df['id'].iloc[competing]], ignore_index=True),
+        'feed_row': np.concatenate(gold_rows + [np.concatenate(quarantine_rows)[competing]]),
+        'shard': np.concatenate([np.repeat(shard_numbers, [len(g) for g in golds]),
+                                 np.repeat(shard_numbers, [len(q) for q in quarantines])[competing]])
+    })
+    order = np.lexsort((candidates['shard'].to_numpy(), candidates['feed_row'].to_numpy()))
+    ordered_ids = candidates['id'].iloc[order]
+    shadowed = np.zeros(len(candidates), dtype=bool)
+    shadowed[order] = (ordered_ids.duplicated(keep='last') & ordered_ids.notna()).to_numpy()
+    if not shadowed.any():
+        return gold_df, quarantine_df, 0
+
+    requarantined = competing[shadowed[len(gold_df):]]
+    quarantine_df.loc[requarantined, 'reason_codes'] = quarantine_df.loc[requarantined, 'reason_codes'].map(_with_duplicate_reason)
+    moved = shadowed[:len(gold_df)]
+    silver_columns = [c for c in quarantine_df.columns if c in gold_df.columns]
+    quarantine_df = pd.concat([quarantine_df, gold_df.loc[moved, silver_columns].assign(reason_codes='duplicate_id', raw_values='{}')],
+                              ignore_index=True)
+    logger.warning(f"🚧 Quarantined {int(moved.sum())} listings whose id appears later in the feed in another shard "
+                   f"({len(requarantined)} already quarantined rows also flagged duplicate_id)")
+    return gold_df[~moved].reset_index(drop=True), quarantine_df, int(shadowed.sum())
+
+def merge_shards(work_dir: Path, output_dir: str = "output", export_profile: str = "full") -> dict:
+    """Merge every shard's gold rows into the global artifacts, in global rank order"""
+    shards = list_shards(work_dir)
+    unscored = [s for s in shards if not (work_dir / s / SHARD_GOLD).exists()]
+    if unscored:
+        raise RuntimeError(f"Shards not scored yet: {unscored}")
+
+    golds = [pd.read_parquet(work_dir / s / SHARD_GOLD) for s in shards]
+    quarantines = [_read_quarantine(work_dir / s) for s in shards]
+    manifests = [json.loads((work_dir / s / SHARD_MANIFEST).read_text()) for s in shards]
+    violations = [m['violations'] for m in manifests if m.get('violations') is not None]
+    # Like a monolithic run, duplicate ids are only quarantined when the shards were validated
+    if violations:
+        gold_df, quarantine_df, duplicates = _resolve_duplicates(work_dir, shards, golds, quarantines)
+    else:
+        gold_df, quarantine_df, duplicates = pd.concat(golds, ignore_index=True), None, 0
+    gold_df = gold_df.sort_values(['di_score', 'id'], ascending=[False, True], kind='stable', ignore_index=True)
+
+    # Exporting the concatenated rows keeps every summary a global aggregate
+    merged = DIPipeline()
+    merged.gold_df = gold_df
+    merged.quarantine_df = _unify_mixed_columns(quarantine_df) if quarantine_df is not None and len(quarantine_df) else None
+    if violations:
+        merged.validation_counts = {}
+        for counts in violations:
+            for rule, count in counts.items():
+                merged.validation_counts[rule] = merged.validation_counts.get(rule, 0) + count
+        if duplicates:
+            merged.validation_counts['duplicate_id'] = merged.validation_counts.get('duplicate_id', 0) + duplicates
+    summary = merged.export_results(output_dir, export_profile=export_profile)
+
+    with open(Path(output_dir) / "shard_manifest.json", 'w') as f:
+        json.dump(manifests, f, indent=2)
+    logger.info(f"🔗 Merged {len(shards)} shards ({len(gold_df)} listings) into {output_dir}/")
+    return summary
+
+def main(argv: List[str] = None):
+    """Partition (optional), score stale or selected shards in parallel, then merge"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Region-sharded D&I pipeline")
+    parser.add_argument("--data-path", default=None,
+                        help="Partition this feed into shards first (omit to reuse the shard inputs in --work-dir)")
+    parser.add_argument("--work-dir", default="output/shards", help="Per-shard inputs, gold outputs and manifests")
+    parser.add_argument("--output-dir", default="output", help="Directory for the merged artifacts")
+    parser.add_argument("--shard-by", choices=["grid", "campus"], default="grid")
+    parser.add_argument("--grid-degrees", type=float, default=DEFAULT_GRID_DEGREES, help="Grid cell size for --shard-by grid")
+    parser.add_argument("--campus", action="append", default=[], metavar="NAME=LAT,LNG",
+                        help="Campus to shard by and score against (repeatable)")
+    parser.add_argument("--shards", nargs="+", default=None, help="Rescore only these shards")
+    parser.add_argument("--force", action="store_true", help="Rescore shards even if their input is unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--low-memory", action="store_true", help="Run each shard's pipeline in low-memory mode")
+    parser.add_argument("--no-validate", action="store_true", help="Skip silver validation and quarantine")
+    parser.add_argument("--export-profile", choices=["full", "compact"], default="full")
+    parser.add_argument("--no-merge", action="store_true", help="Score shards without rebuilding the global artifacts")
+    args = parser.parse_args(argv)
+
+    campuses = parse_campuses(args.campus)
+
+    work_dir = Path(args.work_dir)
+    if args.data_path:
+        partition(args.data_path, work_dir, args.shard_by, args.grid_degrees, campuses)
+
+    config = {'campuses': {name: list(coords) for name, coords in campuses.items()},
+              'low_memory': args.low_memory, 'validate': not args.no_validate}
+    run_shards(work_dir, config, shards=args.shards, force=args.force, workers=args.workers)
+
+    if not args.no_merge:
+        return merge_shards(work_dir, args.output_dir, export_profile=args.export_profile)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Similar Listings
+
+"More like this" lookups over a normalized feature vector per listing: the five
+D&I subscores, rent, bedrooms, the accessibility/inclusivity flags and location.
+Vectors live in one contiguous float32 matrix grouped by an inverted-file (IVF)
+index: a query only scans the few coarse clusters nearest to it, and exact
+brute-force search is kept for small catalogues and for benchmarking.
+"""
+
+import argparse
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SUBSCORE_FEATURES = ['affordability', 'accessibility', 'safety', 'commute', 'inclusivity']
+NUMERIC_FEATURES = ['rent', 'bedrooms', 'lat', 'lng']
+FLAG_FEATURES = ['step_free', 'elevator', 'acc_bath', 'acc_parking', 'well_lit',
+                 'accepts_international', 'no_ssn_ok', 'cosigner_ok', 'anti_disc_policy']
+
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+DEFAULT_PROBES = 8
+# Rows per block when assigning listings to clusters
+BLOCK_ROWS = 65536
+
+def feature_matrix(gold_df: pd.DataFrame) -> np.ndarray:
+    """Listings x features float32 matrix, every feature scaled to [0, 1]"""
+    subscores = pd.DataFrame(gold_df['subscores'].tolist(), index=gold_df.index)
+    columns = [subscores[c].to_numpy(float) / 100 for c in SUBSCORE_FEATURES]
+    for column in NUMERIC_FEATURES:
+        values = pd.to_numeric(gold_df[column], errors='coerce').to_numpy(float)
+        low, high = np.nanmin(values), np.nanmax(values)
+        columns.append((values - low) / (high - low) if high > low else np.zeros_like(values))
+    for column in FLAG_FEATURES:
+        columns.append(gold_df[column].fillna(False).to_numpy(float) if column in gold_df else np.zeros(len(gold_df)))
+
+    matrix = np.column_stack(columns)
+    # Missing values take the column median so they neither attract nor repel
+    medians = np.nanmedian(matrix, axis=0)
+    missing = np.isnan(matrix)
+    matrix[missing] = np.take(np.nan_to_num(medians, nan=0.5), np.nonzero(missing)[1])
+    return np.ascontiguousarray(matrix, dtype=np.float32)
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for every vector, in bounded blocks"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    block = max(1, BLOCK_ROWS * 64 // max(len(centroids), 1))
+    for start in range(0, len(vectors), block):
+        chunk = vectors[start:start + block]
+        assignment[start:start + block] = np.argmin(centroid_norms - 2 * chunk @ centroids.T, axis=1)
+    return assignment
+
+def _top_k(distances: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k smallest distances, nearest first"""
+    k = min(k, len(distances))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(distances, k - 1)[:k]
+    return top[np.argsort(distances[top], kind='stable')]
+
+class SimilarityIndex:
+    def __init__(self, ids: np.ndarray, vectors: np.ndarray, centroids: np.ndarray, offsets: np.ndarray):
+        # Rows are grouped by IVF list: list c occupies vectors[offsets[c]:offsets[c + 1]]
+        self.ids = np.asarray(ids)
+        self.vectors = vectors
+        self.norms = (vectors ** 2).sum(axis=1)
+        self.centroids = centroids
+        self.offsets = offsets
+        # A repeated id (possible with validation off) resolves to its last row, the one validation would keep
+        rows = pd.Series(np.arange(len(self.ids)), index=self.ids)
+        self._rows = rows[~rows.index.duplicated(keep='last')]
+
+    @classmethod
+    def from_gold(cls, gold_df: pd.DataFrame, n_lists: Optional[int] = None, seed: int = 0) -> "SimilarityIndex":
+        """Build feature vectors and an IVF index with ~sqrt(n) lists trained by k-means on a sample"""
+        vectors = feature_matrix(gold_df)
+        n = len(vectors)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+
+        sample = vectors[rng.choice(n, size=min(n, n_lists * KMEANS_SAMPLE_PER_LIST), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            labels = _nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            sizes = np.bincount(labels, minlength=n_lists)
+            filled = sizes > 0
+            centroids[filled] = sums[filled] / sizes[filled, None]
+
+        assignment = _nearest(vectors, centroids)
+        order = np.argsort(assignment, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        return cls(gold_df['id'].to_numpy()[order], np.ascontiguousarray(vectors[order]), centroids, offsets)
+
+    def _distances(self, query: np.ndarray, start: int, stop: int) -> np.ndarray:
+        # Squared L2 without the constant ||query||^2 term
+        return self.norms[start:stop] - 2 * (self.vectors[start:stop] @ query)
+
+    def similar(self, listing_id, k: int = 10, n_probe: int = DEFAULT_PROBES, exact: bool = False) -> pd.DataFrame:
+        """The k listings most similar to `listing_id` (excluding itself), nearest first"""
+        row = self._rows[listing_id]
+        query = self.vectors[row]
+
+        if exact:
+            positions = None
+            distances = self._distances(query, 0, len(self.ids))
+            distances[row] = np.inf
+        else:
+            # Scan only the n_probe lists whose centroids are nearest; each is a contiguous slice
+            lists = _top_k(((self.centroids - query) ** 2).sum(axis=1), n_probe)
+            ranges = [(self.offsets[c], self.offsets[c + 1]) for c in lists]
+            positions = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+            distances = np.concatenate([self._distances(query, start, stop) for start, stop in ranges])
+            distances[positions == row] = np.inf
+
+        top = _top_k(distances, k)
+        top = top[np.isfinite(distances[top])]
+        rows = top if positions is None else positions[top]
+        return pd.DataFrame({
+            'id': self.ids[rows],
+            'distance': np.sqrt(np.maximum(distances[top] + query @ query, 0)).round(4)
+        })
+
+    def save(self, path):
+        # Object arrays would be pickled, which load refuses
+        ids = self.ids.astype(str) if self.ids.dtype == object else self.ids
+        np.savez_compressed(path, ids=ids, vectors=self.vectors, centroids=self.centroids, offsets=self.offsets)
+
+    @classmethod
+    def load(cls, path) -> "SimilarityIndex":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'], data['vectors'], data['centroids'], data['offsets'])
+
+def benchmark(index: SimilarityIndex, n_queries: int = 200, k: int = 10,
+              probes: Tuple[int, ...] = (1, 4, 8, 16), seed: int = 0) -> pd.DataFrame:
+    """Recall@k and mean latency of IVF search at several probe counts against exact brute force"""
+    query_ids = np.random.default_rng(seed).choice(index.ids, size=min(n_queries, len(index.ids)), replace=False)
+
+    started = time.perf_counter()
+    truth = {qid: set(index.similar(qid, k, exact=True)['id']) for qid in query_ids}
+    rows = [{'method': 'brute force', 'n_probe': None, 'recall': 1.0,
+             'latency_ms': (time.perf_counter() - started) / len(query_ids) * 1000}]
+
+    for n_probe in probes:
+        started = time.perf_counter()
+        found = {qid: set(index.similar(qid, k, n_probe=n_probe)['id']) for qid in query_ids}
+        latency = (time.perf_counter() - started) / len(query_ids) * 1000
+        recall = np.mean([len(found[q] & truth[q]) / max(len(truth[q]), 1) for q in query_ids])
+        rows.append({'method': 'ivf', 'n_probe': n_probe, 'recall': round(recall, 4), 'latency_ms': latency})
+    return pd.DataFrame(rows)
+
+def main(argv: List[str] = None):
+    """Look up similar listings or benchmark the index built from a gold Parquet file"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Similar listings lookup")
+    parser.add_argument("--index", default="output/similarity_index.npz", help="Index written by DIPipeline")
+    parser.add_argument("--gold", default=None, help="Build the index from this gold Parquet instead")
+    parser.add_argument("--listing-id", default=None)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--benchmark", action="store_true", help="Compare IVF recall/latency against brute force")
+    args = parser.parse_args(argv)
+
+    if args.gold:
+        started = time.perf_counter()
+        index = SimilarityIndex.from_gold(pd.read_parquet(args.gold))
+        logger.info(f"✅ Built index over {len(index.ids)} listings in {time.perf_counter() - started:.1f}s")
+    else:
+        index = SimilarityIndex.load(args.index)
+
+    if args.listing_id is not None:
+        listing_id = int(args.listing_id) if args.listing_id.lstrip('-').isdigit() else args.listing_id
+        print(index.similar(listing_id, args.k).to_string(index=False))
+    if args.benchmark:
+        print(benchmark(index, k=args.k).to_string(index=False))
+    return index
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Streaming Listing Ingest
+
+Tails a newline-delimited JSON file (or a directory of them) of listing change
+events and keeps the gold artifacts current in micro-batches:
+
+    {"op": "upsert", "id": 42, "version": 7, "ts": "2025-01-01T12:00:00", "listing": {...raw CSV fields...}}
+    {"op": "delete", "id": 42, "version": 8}
+
+Upserted listings go through the same DIPipeline silver cleaning, validation
+and gold scoring as a batch run; only the listings touched by a batch are
+rescored. Upserts that fail validation are written to quarantine/<batch>.parquet
+and the listing's last valid version stays published.
+Events are idempotent per listing: an event is applied only if its version is
+newer than the last one seen for that id (deletes leave a tombstone version),
+so replays and duplicates are no-ops. Events without a numeric version are
+rejected, since they cannot be ordered against a replay.
+
+Every batch writes the gold Parquet and JSON and a manifest.json into a new,
+uniquely named snapshot directory and publishes it by atomically repointing the
+`current` symlink. The full export (CSV, summary, facet and similarity indexes)
+runs on the first publish and then every `full_every` batches; a snapshot's
+manifest names the snapshot holding the latest indexes. The checkpoint then
+records only the rows and versions the batch touched, and is compacted into a
+new base on the full-export cadence. A crash between publishing and
+checkpointing replays the batch into another snapshot, which the version check
+makes harmless.
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from databricks_pipeline import DIPipeline, parse_campuses
+
+logger = logging.getLogger(__name__)
+
+EVENT_SUFFIXES = ('.ndjson', '.jsonl')
+EVENT_OPS = ('upsert', 'delete')
+EVENT_FIELDS = ('op', 'version', 'ts', 'listing')
+DEFAULT_POLL_SECONDS = 1.0
+DEFAULT_MAX_BATCH = 5000
+# Published snapshots kept on disk besides the current one, for readers still holding an older one
+KEEP_SNAPSHOTS = 3
+# Batches between full exports (indexes, CSV, summary) and checkpoint compactions
+DEFAULT_FULL_EVERY = 20
+
+def _event_time(event: dict, read_at: float) -> float:
+    """Source timestamp of an event in epoch seconds, or when it was read if it carries none"""
+    ts = event.get('ts')
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts).timestamp()
+        except ValueError:
+            pass
+    return read_at
+
+def _has_version(event: dict) -> bool:
+    try:
+        return not isinstance(event['version'], bool) and bool(np.isfinite(float(event['version'])))
+    except (KeyError, TypeError, ValueError):
+        return False
+
+def _listing(event: dict) -> dict:
+    """Raw listing fields of an upsert, nested under "listing" or inline with the event fields"""
+    if isinstance(event.get('listing'), dict):
+        return event['listing']
+    return {k: v for k, v in event.items() if k not in EVENT_FIELDS}
+
+class EventTail:
+    """Reads complete new lines from an NDJSON file or directory, remembering byte offsets"""
+
+    def __init__(self, source, offsets: Optional[Dict[str, int]] = None):
+        self.source = Path(source)
+        self.offsets = dict(offsets or {})
+        self.rejected = 0
+
+    def _files(self) -> List[Path]:
+        if self.source.is_dir():
+            return sorted(p for p in self.source.iterdir() if p.suffix in EVENT_SUFFIXES)
+        return [self.source] if self.source.exists() else []
+
+    def poll(self, max_events: int = DEFAULT_MAX_BATCH) -> List[Tuple[dict, float]]:
+        """Up to max_events new (event, read time) pairs; a trailing partial line waits for the next poll"""
+        events = []
+        for path in self._files():
+            key = str(path)
+            offset = self.offsets.get(key, 0)
+            if path.stat().st_size < offset:
+                logger.warning(f"{path} was truncated; reading it from the start")
+                offset = 0
+            read_at = time.time()
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                while len(events) < max_events:
+                    line = f.readline()
+                    if not line.endswith(b'\n'):
+                        break
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        event = None
+                    if (not isinstance(event, dict) or 'id' not in event or not _has_version(event)
+                            or event.get('op', 'upsert') not in EVENT_OPS):
+                        self.rejected += 1
+                        logger.warning(f"Rejected malformed event in {path.name}: {line[:120]!r}")
+                        continue
+                    events.append((event, read_at))
+
+            self.offsets[key] = offset
+            if len(events) >= max_events:
+                break
+        return events
+
+class StreamIngestor:
+    def __init__(self, output_dir: str = "output/stream", state_dir: Optional[str] = None,
+                 campuses: Optional[Dict[str, Tuple[float, float]]] = None, base: Optional[str] = None,
+                 full_every: int = DEFAULT_FULL_EVERY):
+        self.output_dir = Path(output_dir)
+        self.state_dir = Path(state_dir) if state_dir else self.output_dir / "state"
+        self.changes_dir = self.state_dir / "changes"
+        self.campuses = dict(campuses or {})
+        self.full_every = full_every
+        self.changes_dir.mkdir(parents=True, exist_ok=True)
+
+        checkpoint_path = self.state_dir / "checkpoint.json"
+        checkpoint = json.loads(checkpoint_path.read_text()) if checkpoint_path.exists() else {}
+        self.offsets = checkpoint.get('offsets', {})
+        self.batch = checkpoint.get('batch', 0)
+        # Batch of the compacted state the change files apply to; None until one is written
+        self.base_batch = checkpoint.get('base')
+        # Snapshot holding the latest full export, referenced by every manifest
+        self.index_snapshot = checkpoint.get('index_snapshot')
+
+        if self.base_batch is not None:
+            self._load_state(self.state_dir / "base" / f"{self.base_batch:08d}")
+        elif (self.state_dir / "gold.parquet").exists():
+            # Checkpoints written before the change log are a single full base
+            self._load_state(self.state_dir)
+        else:
+            # Listings from a batch run start at version -1, so any streamed version supersedes them
+            self.gold_df = pd.read_parquet(base) if base else pd.DataFrame({'id': pd.Series(dtype='int64')})
+            self.versions = pd.DataFrame({'version': -1, 'deleted': False},
+                                         index=pd.Index(self.gold_df['id'].to_numpy(), name='id'))
+        # Score upserts in the silver mode the published rows were built with: default mode keeps the
+        # source columns next to the standardized ones, low-memory mode only has the renamed ones
+        renamed = [old for old, new in DIPipeline.COLUMN_MAPPING.items() if old != new]
+        self.low_memory = len(self.gold_df.columns) > 1 and not self.gold_df.columns.isin(renamed).any()
+
+    def _load_state(self, base_dir: Path):
+        """Compacted gold rows and versions, then the change files of every checkpointed batch after them"""
+        self.gold_df = pd.read_parquet(base_dir / "gold.parquet")
+        self.versions = pd.read_parquet(base_dir / "versions.parquet").set_index('id')
+        for path in sorted(self.changes_dir.glob("*.versions.parquet")):
+            batch = int(path.name[:8])
+            if batch > self.batch:
+                # Written by a batch that crashed before its checkpoint; it will be replayed
+                path.unlink()
+                (self.changes_dir / f"{batch:08d}.parquet").unlink(missing_ok=True)
+            elif self.base_batch is not None and batch > self.base_batch:
+                self._apply(pd.read_parquet(path).set_index('id'), pd.read_parquet(self.changes_dir / f"{batch:08d}.parquet"))
+
+    def _apply(self, updates: pd.DataFrame, rows: pd.DataFrame):
+        # Replaced and deleted listings leave gold; a quarantined upsert only moves its version
+        replaced = updates.index[updates['replaced'].to_numpy()]
+        self.gold_df = pd.concat([self.gold_df[~self.gold_df['id'].isin(replaced)], rows], ignore_index=True)
+        self.versions = pd.concat([self.versions.drop(updates.index, errors='ignore'), updates[['version', 'deleted']]])
+
+    def _new_events(self, events: List[Tuple[dict, float]]) -> pd.DataFrame:
+        """Latest event per listing whose version is newer than the last applied one"""
+        batch = pd.DataFrame({
+            'id': [e['id'] for e, _ in events],
+            'version': pd.to_numeric([e['version'] for e, _ in events]),
+            'op': [e.get('op', 'upsert') for e, _ in events],
+            'event_time': [_event_time(e, read_at) for e, read_at in events],
+            'position': np.arange(len(events))
+        })
+        batch = batch.sort_values(['id', 'version', 'position'], kind='stable').drop_duplicates('id', keep='last')
+        known = self.versions['version'].reindex(batch['id']).fillna(-np.inf).to_numpy()
+        return batch[batch['version'].to_numpy() > known]
+
+    def _score(self, listings: List[dict], ids: List) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Silver cleaning, validation and gold scoring of upserted raw listings; returns (gold, quarantine)"""
+        raw = pd.DataFrame(listings)
+        raw['id'] = ids
+        # Fields an event leaves out get the same defaults as blank CSV cells
+        raw = raw.reindex(columns=raw.columns.union(list(DIPipeline.COLUMN_MAPPING), sort=False))
+        pipeline = DIPipeline(low_memory=self.low_memory, campuses=self.campuses)
+        pipeline.bronze_df = raw
+        pipeline.silver_layer()
+        scored = pipeline.gold_layer()
+
+        # Columns silver leaves untyped follow the dtypes already published, so snapshots stay consistent
+        for column in scored.columns.intersection(self.gold_df.columns):
+            dtype = self.gold_df[column].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                scored[column] = scored[column].astype(str).str.lower().isin(['true', '1', 'yes'])
+            elif pd.api.types.is_numeric_dtype(dtype):
+                scored[column] = pd.to_numeric(scored[column], errors='coerce')
+        return scored, pipeline.quarantine_df
+
+    def process(self, events: List[Tuple[dict, float]]) -> Dict:
+        """Apply one micro-batch, publish the gold artifacts and checkpoint"""
+        started = time.perf_counter()
+        applied = self._new_events(events)
+        upserts = applied[applied['op'] == 'upsert']
+        deletes = applied[applied['op'] == 'delete']
+
+        quarantined = pd.DataFrame({'id': []})
+        updates, rows = None, self.gold_df.iloc[:0]
+        if len(applied):
+            if len(upserts):
+                listings = [_listing(events[i][0]) for i in upserts['position']]
+                rows, quarantined = self._score(listings, upserts['id'].tolist())
+            if len(quarantined):
+                quarantine_dir = self.output_dir / "quarantine"
+                quarantine_dir.mkdir(parents=True, exist_ok=True)
+                quarantined.to_parquet(quarantine_dir / f"{self.batch + 1:08d}.parquet", index=False)
+
+            # A quarantined upsert leaves the last valid version of the listing published
+            updates = pd.DataFrame({'version': applied['version'].to_numpy(),
+                                    'deleted': (applied['op'] == 'delete').to_numpy(),
+                                    'replaced': (~applied['id'].isin(quarantined['id'])).to_numpy()},
+                                   index=pd.Index(applied['id'].to_numpy(), name='id'))
+            self._apply(updates, rows)
+        scored = time.perf_counter()
+
+        self.batch += 1
+        full = self.index_snapshot is None or (self.full_every > 0 and self.batch % self.full_every == 0)
+        if len(applied):
+            self._publish(full)
+        published_at = time.time()
+        self._checkpoint(updates, rows, compact=full or self.base_batch is None)
+
+        freshness = published_at - applied['event_time'].to_numpy() if len(applied) else np.array([])
+        elapsed = time.perf_counter() - started
+        metrics = {
+            'batch': self.batch,
+            'events': len(events),
+            'applied': len(applied),
+            'upserts': len(upserts),
+            'deletes': len(deletes),
+            'full_export': bool(full and len(applied)),
+            'quarantined': len(quarantined),
+            'skipped': len(events) - len(applied),
+            'listings': len(self.gold_df),
+            'score_ms': round((scored - started) * 1000, 1),
+            'publish_ms': round((time.perf_counter() - scored) * 1000, 1),
+            'events_per_s': round(len(events) / elapsed, 1) if elapsed else None,
+            'freshness_p50_s': round(float(np.percentile(freshness, 50)), 3) if len(freshness) else None,
+            'freshness_p95_s': round(float(np.percentile(freshness, 95)), 3) if len(freshness) else None,
+            'freshness_max_s': round(float(freshness.max()), 3) if len(freshness) else None
+        }
+        with open(self.output_dir / "stream_metrics.ndjson", 'a') as f:
+            f.write(json.dumps(metrics) + "\n")
+        freshness_note = (f", freshness p50 {metrics['freshness_p50_s']}s p95 {metrics['freshness_p95_s']}s"
+                          if len(freshness) else "")
+        logger.info(f"🌊 Batch {self.batch}: {metrics['applied']}/{metrics['events']} events applied "
+                    f"({metrics['upserts']} upserts, {metrics['deletes']} deletes), "
+                    f"{metrics['events_per_s']} events/s{freshness_note}")
+        return metrics
+
+    def _publish(self, full: bool):
+        """Write a fresh snapshot directory and atomically repoint `current` at it
+
+        Only the gold Parquet, JSON and a manifest are written per batch; a full export also
+        rebuilds the CSV, summary, facet and similarity indexes, which later manifests point to.
+        """
+        snapshots = self.output_dir / "snapshots"
+        snapshots.mkdir(parents=True, exist_ok=True)
+        # Unique per publish: a batch replayed after a crash must not overwrite the snapshot `current` points to
+        snapshot = snapshots / f"{self.batch:08d}-{time.time_ns()}"
+
+        if full:
+            exporter = DIPipeline()
+            exporter.gold_df = self.gold_df
+            exporter.export_results(str(snapshot))
+            self.index_snapshot = str(snapshot.relative_to(self.output_dir))
+        else:
+            snapshot.mkdir()
+            self.gold_df.to_parquet(snapshot / "housing_di_scores.parquet", index=False)
+            self.gold_df.to_json(snapshot / "gold_housing_data.json", orient='records')
+        manifest = {
+            'batch': self.batch,
+            'listings': len(self.gold_df),
+            'published_at': datetime.now().isoformat(),
+            'full_export': full,
+            # Facet/similarity indexes, CSV and summary, relative to the output directory
+            'indexes': self.index_snapshot
+        }
+        (snapshot / "manifest.json").write_text(json.dumps(manifest, indent=2))
+
+        link = self.output_dir / "current"
+        staging = self.output_dir / ".current.tmp"
+        staging.unlink(missing_ok=True)
+        os.symlink(snapshot.relative_to(self.output_dir), staging)
+        os.replace(staging, link)
+
+    @staticmethod
+    def _write(frame: pd.DataFrame, path: Path):
+        staging = path.with_name(path.name + ".tmp")
+        frame.to_parquet(staging, index=False)
+        staging.replace(path)
+
+    def _checkpoint(self, updates: Optional[pd.DataFrame], rows: pd.DataFrame, compact: bool):
+        """Record the batch's touched rows and versions (or a compacted base), then the offsets"""
+        if compact:
+            base_dir = self.state_dir / "base" / f"{self.batch:08d}"
+            base_dir.mkdir(parents=True, exist_ok=True)
+            self._write(self.gold_df, base_dir / "gold.parquet")
+            self._write(self.versions.reset_index(), base_dir / "versions.parquet")
+            self.base_batch = self.batch
+        elif updates is not None:
+            self._write(rows, self.changes_dir / f"{self.batch:08d}.parquet")
+            self._write(updates.reset_index(), self.changes_dir / f"{self.batch:08d}.versions.parquet")
+
+        staging = self.state_dir / "checkpoint.json.tmp"
+        staging.write_text(json.dumps({'offsets': self.offsets, 'batch': self.batch, 'base': self.base_batch,
+                                       'index_snapshot': self.index_snapshot}, indent=2))
+        staging.replace(self.state_dir / "checkpoint.json")
+
+        # Cleanup only follows the checkpoint, so a crash never loses the state or snapshots it names
+        if compact:
+            for old in (self.state_dir / "base").iterdir():
+                if old.name != f"{self.base_batch:08d}":
+                    shutil.rmtree(old)
+            for path in self.changes_dir.glob("*.parquet"):
+                if int(path.name[:8]) <= self.base_batch:
+                    path.unlink()
+            for name in ("gold.parquet", "versions.parquet"):
+                (self.state_dir / name).unlink(missing_ok=True)
+        snapshots = self.output_dir / "snapshots"
+        if snapshots.exists():
+            for old in sorted(snapshots.iterdir())[:-(KEEP_SNAPSHOTS + 1)]:
+                if str(old.relative_to(self.output_dir)) != self.index_snapshot:
+                    shutil.rmtree(old)
+
+    def run(self, source, poll_seconds: float = DEFAULT_POLL_SECONDS, max_batch: int = DEFAULT_MAX_BATCH,
+            once: bool = False) -> List[Dict]:
+        """Tail `source` and process micro-batches; with once=True stop when it is drained"""
+        tail = EventTail(source, self.offsets)
+        self.offsets = tail.offsets
+        history = []
+        started = time.perf_counter()
+        try:
+            while True:
+                events = tail.poll(max_batch)
+                if events:
+                    history.append(self.process(events))
+                elif once:
+                    break
+                else:
+                    time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            logger.info("Stopping stream ingest")
+
+        total = sum(m['events'] for m in history)
+        elapsed = time.perf_counter() - started
+        logger.info(f"✅ Ingested {total} events in {len(history)} batches "
+                    f"({total / elapsed if elapsed else 0:.0f} events/s, {tail.rejected} rejected)")
+        return history
+
+def main(argv: List[str] = None):
+    """Tail listing change events and keep the gold artifacts current"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Streaming listing ingest with micro-batched gold updates")
+    parser.add_argument("--source", required=True, help="NDJSON event file or directory of .ndjson/.jsonl files")
+    parser.add_argument("--output-dir", default="output/stream", help="Snapshots, `current` link and metrics")
+    parser.add_argument("--state-dir", default=None, help="Checkpoint directory (default: <output-dir>/state)")
+    parser.add_argument("--base", default=None, help="Gold Parquet of a batch run to start from")
+    parser.add_argument("--campus", action="append", default=[], metavar="NAME=LAT,LNG",
+                        help="Score commute and safety against this campus (repeatable)")
+    parser.add_argument("--poll-seconds", type=float, default=DEFAULT_POLL_SECONDS)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Most events per micro-batch")
+    parser.add_argument("--once", action="store_true", help="Process the events available now and exit")
+    parser.add_argument("--full-every", type=int, default=DEFAULT_FULL_EVERY,
+                        help="Batches between full exports (indexes, CSV, summary) and checkpoint compactions; "
+                             "0 runs the full export only on the first publish")
+    args = parser.parse_args(argv)
+
+    campuses = parse_campuses(args.campus)
+
+    ingestor = StreamIngestor(args.output_dir, args.state_dir, campuses=campuses, base=args.base,
+                              full_every=args.full_every)
+    return ingestor.run(args.source, args.poll_seconds, args.max_batch, once=args.once)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("pyspark")
+pytest.importorskip("delta")
+
+from delta import configure_spark_with_delta_pip
+from pyspark.sql import SparkSession
+
+# dbx/ holds Databricks notebooks rather than a package, so load the module from its file
+_spec = importlib.util.spec_from_file_location("delta_io", Path(__file__).parents[1] / "dbx" / "delta_io.py")
+delta_io = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(delta_io)
+
+COLUMNS = ["id", "name", "rent", "overall_di_score", "score_tier"]
+
+@pytest.fixture(scope="module")
+def spark():
+    builder = (
+        SparkSession.builder.master("local[2]")
+        .config("spark.sql.extensions", "io.delta.sql.DeltaSparkSessionExtension")
+        .config("spark.sql.catalog.spark_catalog", "org.apache.spark.sql.delta.catalog.DeltaCatalog")
+        .config("spark.sql.shuffle.partitions", "2")
+    )
+    session = configure_spark_with_delta_pip(builder).getOrCreate()
+    yield session
+    session.stop()
+
+def test_merge_scores_updates_inserts_and_deletes(spark, tmp_path: Path):
+    target = str(tmp_path / "housing_di_scores")
+    first = spark.createDataFrame([
+        (1, "University Heights Apartments", 1200.0, 83.4, "Silver"),
+        (2, "International House", 950.0, 91.2, "Gold"),
+        (3, "Campus View", 1500.0, 72.0, "Bronze"),
+    ], COLUMNS)
+    assert delta_io.merge_scores(spark, first, target) == {"numTargetRowsInserted": "3"}
+
+    # A rent drop on listing 3, a new listing 4 and listing 2 delisted; listing 1 is unchanged
+    second = spark.createDataFrame([
+        (1, "University Heights Apartments", 1200.0, 83.4, "Silver"),
+        (3, "Campus View", 1350.0, 76.5, "Bronze"),
+        (4, "Maple Commons", 1100.0, 80.1, "Silver"),
+    ], COLUMNS)
+    metrics = delta_io.merge_scores(spark, second, target)
+    assert metrics["numTargetRowsUpdated"] == "1"
+    assert metrics["numTargetRowsInserted"] == "1"
+    assert metrics["numTargetRowsDeleted"] == "1"
+
+    stored = spark.read.format("delta").load(target).orderBy("id").collect()
+    assert [tuple(row) for row in stored] == [tuple(row) for row in second.orderBy("id").collect()]
+
+def test_write_partitioned_replaces_stale_partitions(spark, tmp_path: Path):
+    path = str(tmp_path / "exports")
+    delta_io.write_partitioned(spark.createDataFrame([
+        (1, "A", 1200.0, 91.0, "Gold"),
+        (2, "B", 950.0, 80.0, "Silver"),
+    ], COLUMNS), path)
+    delta_io.write_partitioned(spark.createDataFrame([(2, "B", 950.0, 80.0, "Silver")], COLUMNS), path)
+
+    assert not (tmp_path / "exports" / "score_tier=Gold").exists()
+    assert spark.read.parquet(path).count() == 1
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from score_history import FIELD_SCALES, SUBSCORES, ScoreHistory, history_frame
+
+RUN_AT = datetime(2024, 1, 1, 9, 0)
+
+def make_gold(ids, seed=0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    scores = rng.integers(0, 10001, size=(len(ids), len(SUBSCORES) + 1)) / 100
+    return pd.DataFrame({
+        'id': list(ids),
+        'di_score': scores[:, 0],
+        'subscores': [dict(zip(SUBSCORES, row)) for row in scores[:, 1:]],
+        'rent': rng.integers(500, 3000, size=len(ids)).astype(float),
+        'score_tier': rng.choice(['Gold', 'Silver', 'Bronze'], size=len(ids))
+    })
+
+def latest(history: ScoreHistory, listing_id) -> pd.Series:
+    return history.listing_history(listing_id).iloc[-1]
+
+def assert_matches(history: ScoreHistory, gold_df: pd.DataFrame):
+    expected = history_frame(gold_df)
+    for listing_id, row in expected.iterrows():
+        last = latest(history, listing_id)
+        for name in FIELD_SCALES:
+            assert last[name] == row[name], (listing_id, name)
+        assert last['score_tier'] == row['score_tier']
+
+def test_deltas_reconstruct_every_run_exactly(tmp_path: Path):
+    history = ScoreHistory(tmp_path)
+    previous = None
+    for run in range(5):
+        gold_df = make_gold(range(50), seed=run)
+        # Keep most listings unchanged between runs
+        if previous is not None:
+            gold_df.iloc[10:] = previous.iloc[10:].to_numpy()
+        history.append(gold_df, run_at=RUN_AT + timedelta(days=run))
+        assert_matches(history, gold_df)
+        previous = gold_df
+    assert len(history.trends()) == 5
+    assert history.trends()['updated'].iloc[1:].le(10).all()
+
+def test_delete_then_reinsert(tmp_path: Path):
+    history = ScoreHistory(tmp_path)
+    first, second = make_gold([1, 2, 3]), make_gold([1, 3])
+    third = pd.concat([second, make_gold([2], seed=7)], ignore_index=True)
+    for day, gold_df in enumerate([first, second, third]):
+        history.append(gold_df, run_at=RUN_AT + timedelta(days=day))
+
+    rows = history.listing_history(2)
+    assert rows['op'].tolist() == ['insert', 'delete', 'insert']
+    assert rows.iloc[1][list(FIELD_SCALES)].isna().all()
+    assert pd.isna(rows.iloc[1]['score_tier'])
+    assert_matches(history, third)
+
+def test_interrupted_append_is_not_double_counted(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    history = ScoreHistory(tmp_path)
+    first, second = make_gold(range(5)), make_gold(range(5), seed=1)
+    history.append(first, run_at=RUN_AT)
+
+    # Crash after the delta part and runs.parquet, before state.parquet is replaced
+    replace = ScoreHistory._replace
+    def crash_on_state(frame, path, metadata=None):
+        if path == history.state_path:
+            raise OSError("disk full")
+        replace(frame, path, metadata)
+    monkeypatch.setattr(ScoreHistory, '_replace', staticmethod(crash_on_state))
+    with pytest.raises(OSError):
+        history.append(second, run_at=RUN_AT + timedelta(days=1))
+    monkeypatch.undo()
+
+    assert len(history.trends()) == 1
+    assert_matches(history, first)
+    history.append(second, run_at=RUN_AT + timedelta(days=2))
+    assert len(history.trends()) == 2
+    assert len(list(history.deltas_path.rglob('part-*.parquet'))) == 2
+    assert not (history.deltas_path / f"run_date={(RUN_AT + timedelta(days=1)).date().isoformat()}").exists()
+    assert_matches(history, second)
+
+def test_rejects_a_recorded_run(tmp_path: Path):
+    history = ScoreHistory(tmp_path)
+    history.append(make_gold(range(3)), run_at=RUN_AT)
+    with pytest.raises(ValueError):
+        history.append(make_gold(range(3), seed=1), run_at=RUN_AT)
+
+def test_empty_gold_records_an_empty_run(tmp_path: Path):
+    history = ScoreHistory(tmp_path)
+    run = history.append(make_gold([]), run_at=RUN_AT)
+    assert run['listings'] == 0
+    history.append(make_gold([1, 2]), run_at=RUN_AT + timedelta(days=1))
+    assert history.listing_history(1)['op'].tolist() == ['insert']
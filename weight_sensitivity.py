@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Inclusive Housing Navigator - Weight Sensitivity Analysis
+
+Monte-Carlo check of how stable the D&I rankings and tiers are under the
+35/20/20/15/10 weights: weight vectors are sampled around the defaults, the
+whole catalogue is re-ranked for every sample in batched matrix form, and
+per-listing rank intervals and tier-flip probabilities are reported.
+"""
+
+import argparse
+import logging
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from databricks_pipeline import DEFAULT_TIER, SCORE_WEIGHTS, TIER_THRESHOLDS
+
+logger = logging.getLogger(__name__)
+
+# Dirichlet concentration around the default weights; 100 gives the 35% weight a
+# standard deviation of about 5 points
+DEFAULT_CONCENTRATION = 100.0
+# Samples per matrix product / batched argsort
+SAMPLE_BLOCK = 64
+# Samples whose full rankings are kept to estimate rank percentiles
+INTERVAL_SAMPLES = 200
+
+def sample_weights(weights: Sequence[float], n_samples: int, concentration: float = DEFAULT_CONCENTRATION,
+                   seed: Optional[int] = 0) -> np.ndarray:
+    """Draw weight vectors from a Dirichlet centred on `weights` (n_samples x components)"""
+    base = np.asarray(weights, dtype=float)
+    base = base / base.sum()
+    return np.random.default_rng(seed).dirichlet(base * concentration, size=n_samples)
+
+def _tier_index(scores: np.ndarray, cutoffs: np.ndarray) -> np.ndarray:
+    """Index into the tier list (0 = best) for every score; the last index is the default tier"""
+    index = np.zeros(scores.shape, dtype=np.int8)
+    for cutoff in cutoffs:
+        index += scores < cutoff
+    return index
+
+def weight_sensitivity(subscores: np.ndarray, weights: Optional[Sequence[float]] = None,
+                       thresholds: Optional[List[Tuple[float, str]]] = None, n_samples: int = 2000,
+                       concentration: float = DEFAULT_CONCENTRATION, seed: Optional[int] = 0) -> pd.DataFrame:
+    """
+    Rank intervals and tier-flip probabilities for every listing.
+
+    `subscores` is a listings x components matrix in SCORE_WEIGHTS order. Listings
+    with identical subscores always score alike, so rows are deduplicated and each
+    sample ranks the distinct rows only, weighting them by multiplicity. Ranks are
+    1-based; ties under the default weights share the best rank.
+    """
+    weights = list(SCORE_WEIGHTS.values()) if weights is None else list(weights)
+    thresholds = TIER_THRESHOLDS if thresholds is None else thresholds
+    cutoffs = np.array([t for t, _ in thresholds], dtype=float)
+
+    unique, inverse, counts = np.unique(np.asarray(subscores, dtype=float), axis=0,
+                                        return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    n_unique, total = len(unique), counts.sum()
+
+    # Baseline: competition ranks (1 + listings scoring strictly higher) under the default weights
+    base_scores = unique @ (np.asarray(weights, dtype=float) / np.sum(weights))
+    order = np.argsort(base_scores)
+    cum = np.cumsum(counts[order])
+    not_higher = cum[np.searchsorted(base_scores[order], base_scores, side='right') - 1]
+    base_rank = total - not_higher + 1
+    base_tier = _tier_index(base_scores, cutoffs)
+
+    samples = sample_weights(weights, n_samples, concentration, seed)
+    rank_min = np.full(n_unique, np.iinfo(np.int32).max, dtype=np.int32)
+    rank_max = np.zeros(n_unique, dtype=np.int32)
+    flips = np.zeros(n_unique, dtype=np.int64)
+    kept = np.empty((min(INTERVAL_SAMPLES, n_samples), n_unique), dtype=np.int32)
+    unique_t = unique.T.astype(np.float32)
+    counts32 = counts.astype(np.int32)
+    rows = np.arange(SAMPLE_BLOCK)[:, None]
+
+    for start in range(0, n_samples, SAMPLE_BLOCK):
+        block = samples[start:start + SAMPLE_BLOCK].astype(np.float32)
+        # Samples x distinct listings, so each sample's ranking is a contiguous row sort
+        scores = block @ unique_t
+
+        # Ordinal ranks of the distinct rows, expanded by multiplicity via a cumulative count
+        order = np.argsort(-scores, axis=1)
+        ordered_counts = counts32[order]
+        ranks = np.empty_like(ordered_counts)
+        ranks[rows[:len(block)], order] = np.cumsum(ordered_counts, axis=1) - ordered_counts + 1
+
+        np.minimum(rank_min, ranks.min(axis=0), out=rank_min)
+        np.maximum(rank_max, ranks.max(axis=0), out=rank_max)
+        flips += (_tier_index(scores, cutoffs) != base_tier).sum(axis=0)
+        if start < len(kept):
+            stop = min(start + len(block), len(kept))
+            kept[start:stop] = ranks[:stop - start]
+
+    p05, p50, p95 = np.percentile(kept, [5, 50, 95], axis=0)
+    tier_names = np.array([name for _, name in thresholds] + [DEFAULT_TIER])
+    result = pd.DataFrame({
+        'base_rank': base_rank,
+        'base_tier': tier_names[base_tier],
+        'rank_min': rank_min,
+        'rank_p05': p05.round().astype(int),
+        'rank_median': p50.round().astype(int),
+        'rank_p95': p95.round().astype(int),
+        'rank_max': rank_max,
+        'tier_flip_prob': flips / n_samples
+    })
+    return result.iloc[inverse].reset_index(drop=True)
+
+def subscores_from_gold(gold_df: pd.DataFrame) -> np.ndarray:
+    """Subscore matrix in SCORE_WEIGHTS order from either pipeline's gold output"""
+    if 'subscores' in gold_df:
+        return pd.DataFrame(gold_df['subscores'].tolist(), index=gold_df.index)[list(SCORE_WEIGHTS)].to_numpy(float)
+    return gold_df[[f'{c}_score' for c in SCORE_WEIGHTS]].to_numpy(float)
+
+def main(argv: List[str] = None):
+    """Run the sensitivity analysis over an exported gold Parquet file"""
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Monte-Carlo weight sensitivity of D&I rankings")
+    parser.add_argument("--gold", default="output/housing_di_scores.parquet", help="Gold Parquet from either pipeline")
+    parser.add_argument("--samples", type=int, default=2000, help="Number of sampled weight vectors")
+    parser.add_argument("--concentration", type=float, default=DEFAULT_CONCENTRATION,
+                        help="Dirichlet concentration (higher = samples closer to the defaults)")
+    parser.add_argument("--tiers", default=None, metavar="GOLD,SILVER,BRONZE",
+                        help="Tier cut-offs, e.g. 90,80,70 for local_pipeline output (default: pipeline tiers)")
+    parser.add_argument("--output", default="output/weight_sensitivity.parquet")
+    args = parser.parse_args(argv)
+
+    thresholds = None
+    if args.tiers:
+        cutoffs = [float(v) for v in args.tiers.split(",")]
+        thresholds = list(zip(cutoffs, [name for _, name in TIER_THRESHOLDS]))
+
+    gold_df = pd.read_parquet(args.gold)
+    started = time.perf_counter()
+    result = weight_sensitivity(subscores_from_gold(gold_df), thresholds=thresholds,
+                                n_samples=args.samples, concentration=args.concentration)
+    result.insert(0, 'id', gold_df['id'].to_numpy())
+    logger.info(f"✅ {args.samples} weight samples over {len(gold_df)} listings in {time.perf_counter() - started:.1f}s")
+    logger.info(f"📊 Listings with tier-flip probability > 10%: {(result['tier_flip_prob'] > 0.1).mean():.1%}")
+
+    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+    result.to_parquet(args.output, index=False)
+    return result
+
+if __name__ == "__main__":
+    main()